@@ -56,13 +56,21 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-view query/latency profiling (tracker/profiling.py); report with
+# `manage.py profiling_report` or /api/profiling/ as a staff user.
+PROFILING = os.environ.get('PROFILING', 'False').lower() == 'true'
+PROFILING_DIR = os.environ.get('PROFILING_DIR', BASE_DIR / '.cache' / 'profiling')
+PROFILING_N_PLUS_ONE = int(os.environ.get('PROFILING_N_PLUS_ONE', 5))
+if PROFILING:
+    # First, so wall time includes every other middleware's queries
+    MIDDLEWARE.insert(0, 'tracker.profiling.ProfilingMiddleware')
+
 ROOT_URLCONF = 'health_tracker.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -70,6 +78,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Parse each template once per process whatever DEBUG is; under runserver
+            # the autoreloader empties the cache when a template file changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -92,6 +108,41 @@ database_url = os.environ.get('DATABASE_URL')
 if database_url:
     DATABASES['default'] = dj_database_url.config(default=database_url, conn_max_age=600, ssl_require=not DEBUG)
 
+# Async views run a page's independent queries on separate connections at once
+# (tracker/async_views.py). Each worker thread holds its own connection.
+ASYNC_QUERY_FANOUT = os.environ.get('ASYNC_QUERY_FANOUT', 'True').lower() == 'true'
+
+# Refresh daily summaries, goal progress and trends in `manage.py run_worker`
+# instead of inside the request that wrote the entry (tracker/jobs.py). The
+# worker invalidates cached pages, so pair it with a shared cache backend.
+BACKGROUND_JOBS = os.environ.get('BACKGROUND_JOBS', 'False').lower() == 'true'
+
+
+# Cache
+# Per-user tracker contexts are cached and invalidated by a version bump on every
+# write (see tracker/caching.py). Local memory is per process and LRU-evicted;
+# set CACHE_BACKEND=file to share one cache between gunicorn workers.
+
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))
+
+if os.environ.get('CACHE_BACKEND', 'locmem') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / '.cache'),
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'health-tracker',
+            'TIMEOUT': CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -133,8 +184,9 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# WhiteNoise static files storage (for production)
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise's compressed manifest storage, which also bundles the vendored
+# Bootstrap/Chart.js assets with the app's own during collectstatic (tracker/assets.py)
+STATICFILES_STORAGE = 'tracker.assets.BundledStaticFilesStorage'
 
 # Media files
 MEDIA_URL = '/media/'
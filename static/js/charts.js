@@ -0,0 +1,17 @@
+// Chart series arrive as JSON data islands (<script type="application/json">) that the
+// views build with tracker/charts.py: one array per column, dates as ISO strings.
+window.trackerCharts = {
+    data: function(id) {
+        const island = document.getElementById(id);
+        return island ? JSON.parse(island.textContent) : null;
+    },
+
+    // 'YYYY-MM-DD' -> 'Jan 05', like the templates' date:"M d"
+    dayLabels: function(dates) {
+        return dates.map(function(day) {
+            return new Date(day + 'T00:00:00Z').toLocaleDateString('en-US', {
+                month: 'short', day: '2-digit', timeZone: 'UTC'
+            });
+        });
+    }
+};
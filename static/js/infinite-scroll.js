@@ -0,0 +1,51 @@
+// Progressive enhancement for the cursor-paginated history tables: when the
+// "Older" link scrolls into view, fetch that page and append its rows in place.
+document.addEventListener('DOMContentLoaded', function() {
+    if (!('IntersectionObserver' in window)) {
+        return;
+    }
+
+    document.querySelectorAll('nav[data-infinite-scroll]').forEach(function(nav) {
+        const link = nav.querySelector('a[data-next-page]');
+        const tbody = nav.closest('.card-body') && nav.closest('.card-body').querySelector('tbody');
+        if (!link || !tbody) {
+            return;
+        }
+
+        let loading = false;
+        const observer = new IntersectionObserver(function(entries) {
+            if (!entries[0].isIntersecting || loading) {
+                return;
+            }
+            loading = true;
+            fetch(link.href, {credentials: 'same-origin'})
+                .then(function(response) {
+                    if (!response.ok) {
+                        throw new Error(response.statusText);
+                    }
+                    return response.text();
+                })
+                .then(function(html) {
+                    const page = new DOMParser().parseFromString(html, 'text/html');
+                    const next = page.querySelector('nav[data-infinite-scroll]');
+                    const rows = next && next.closest('.card-body').querySelectorAll('tbody > tr');
+                    (rows || []).forEach(function(row) {
+                        tbody.appendChild(document.importNode(row, true));
+                    });
+                    const older = next && next.querySelector('a[data-next-page]');
+                    if (older) {
+                        link.href = older.href;
+                        loading = false;
+                    } else {
+                        observer.disconnect();
+                        link.closest('li').remove();
+                    }
+                })
+                .catch(function() {
+                    // Leave the plain link in place so the user can still page manually.
+                    observer.disconnect();
+                });
+        }, {rootMargin: '200px'});
+        observer.observe(link);
+    });
+});
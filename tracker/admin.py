@@ -1,46 +1,122 @@
+from django.apps import apps
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
+from .goal_progress import with_progress
+from .jobs import enqueue
 from .models import (
     UserProfile, WeightEntry, Exercise, Nutrition, Sleep, 
-    WaterIntake, HealthGoal, Mood, Medication, HealthMetric
+    WaterIntake, HealthGoal, Mood, Medication, HealthMetric, DailySummary, RecomputeJob
 )
+from .pagination import EstimatedCountPaginator
+from .stats import BMI_CATEGORIES, age_expression, bmi_category, bmi_expression
+
+BMI_COLORS = {'underweight': 'red', 'normal': 'green', 'overweight': 'orange', 'obese': 'red'}
+
+
+class TrackerModelAdmin(admin.ModelAdmin):
+    """Changelists run a fixed number of queries however many rows they show.
+
+    The owning user is joined rather than fetched per row, computed columns are
+    annotated in get_queryset(), and large tables are counted from an estimate.
+    """
+    list_select_related = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class RangeListFilter(admin.SimpleListFilter):
+    """Filter on an annotation named ``parameter_name`` by ``(value, label, lower, upper)`` ranges"""
+    ranges = []
+    unknown_label = None  # offer a NULL choice under this label
+
+    def lookups(self, request, model_admin):
+        choices = [(value, label) for value, label, _, _ in self.ranges]
+        if self.unknown_label:
+            choices.append(('unknown', self.unknown_label))
+        return choices
+
+    def queryset(self, request, queryset):
+        if self.value() == 'unknown':
+            return queryset.filter(**{f'{self.parameter_name}__isnull': True})
+        for value, _, lower, upper in self.ranges:
+            if self.value() == value:
+                if lower is not None:
+                    queryset = queryset.filter(**{f'{self.parameter_name}__gte': lower})
+                if upper is not None:
+                    queryset = queryset.filter(**{f'{self.parameter_name}__lt': upper})
+        return queryset
+
+
+class BMIFilter(RangeListFilter):
+    title = 'BMI'
+    parameter_name = 'bmi'
+    ranges = BMI_CATEGORIES
+    unknown_label = 'No height on profile'
+
+
+class AgeFilter(RangeListFilter):
+    title = 'age'
+    parameter_name = 'age'
+    ranges = [
+        ('under_30', 'Under 30', None, 30),
+        ('30_44', '30 - 44', 30, 45),
+        ('45_59', '45 - 59', 45, 60),
+        ('60_plus', '60+', 60, None),
+    ]
+    unknown_label = 'No date of birth'
+
+
+class ProgressFilter(RangeListFilter):
+    title = 'progress'
+    parameter_name = 'progress_percentage'
+    ranges = [
+        ('not_started', 'Not started', None, 0.1),
+        ('under_50', 'Under 50%', 0.1, 50),
+        ('50_80', '50 - 80%', 50, 80),
+        ('80_99', '80 - 99%', 80, 100),
+        ('reached', 'Reached', 100, None),
+    ]
 
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(TrackerModelAdmin):
     list_display = ['user', 'gender', 'height', 'activity_level', 'get_age', 'created_at']
-    list_filter = ['gender', 'activity_level', 'created_at']
+    list_filter = ['gender', 'activity_level', AgeFilter, 'created_at']
     search_fields = ['user__username', 'user__email']
     readonly_fields = ['created_at', 'updated_at']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(age=age_expression('date_of_birth', timezone.now().date()))
+
+    def get_age(self, obj):
+        return obj.age
+    get_age.short_description = 'Age'
+    get_age.admin_order_field = 'age'
+
 
 @admin.register(WeightEntry)
-class WeightEntryAdmin(admin.ModelAdmin):
+class WeightEntryAdmin(TrackerModelAdmin):
     list_display = ['user', 'weight', 'date', 'get_bmi', 'created_at']
-    list_filter = ['date', 'created_at']
+    list_filter = ['date', BMIFilter, 'created_at']
+    list_select_related = ['user', 'user__userprofile']
     search_fields = ['user__username', 'notes']
     readonly_fields = ['created_at']
     date_hierarchy = 'date'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(bmi=bmi_expression('weight', 'user__userprofile__height'))
+
     def get_bmi(self, obj):
-        if obj.user.profile.height:
-            bmi = obj.user.profile.get_bmi(obj.weight)
-            if bmi:
-                if bmi < 18.5:
-                    color = 'red'
-                elif bmi < 25:
-                    color = 'green'
-                elif bmi < 30:
-                    color = 'orange'
-                else:
-                    color = 'red'
-                return format_html('<span style="color: {};">{}</span>', color, bmi)
-        return '-'
+        if obj.bmi is None:
+            return '-'
+        return format_html('<span style="color: {};">{}</span>', BMI_COLORS[bmi_category(obj.bmi)], obj.bmi)
     get_bmi.short_description = 'BMI'
+    get_bmi.admin_order_field = 'bmi'
 
 
 @admin.register(Exercise)
-class ExerciseAdmin(admin.ModelAdmin):
+class ExerciseAdmin(TrackerModelAdmin):
     list_display = ['user', 'exercise_type', 'name', 'duration', 'calories_burned', 'date']
     list_filter = ['exercise_type', 'date', 'created_at']
     search_fields = ['user__username', 'name', 'notes']
@@ -49,7 +125,7 @@ class ExerciseAdmin(admin.ModelAdmin):
 
 
 @admin.register(Nutrition)
-class NutritionAdmin(admin.ModelAdmin):
+class NutritionAdmin(TrackerModelAdmin):
     list_display = ['user', 'meal_type', 'food_name', 'calories', 'protein', 'carbs', 'fat', 'date']
     list_filter = ['meal_type', 'date', 'created_at']
     search_fields = ['user__username', 'food_name', 'notes']
@@ -58,7 +134,7 @@ class NutritionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Sleep)
-class SleepAdmin(admin.ModelAdmin):
+class SleepAdmin(TrackerModelAdmin):
     list_display = ['user', 'sleep_time', 'wake_time', 'duration_hours', 'quality']
     list_filter = ['quality', 'sleep_time', 'created_at']
     search_fields = ['user__username', 'notes']
@@ -67,7 +143,7 @@ class SleepAdmin(admin.ModelAdmin):
 
 
 @admin.register(WaterIntake)
-class WaterIntakeAdmin(admin.ModelAdmin):
+class WaterIntakeAdmin(TrackerModelAdmin):
     list_display = ['user', 'amount', 'date', 'time', 'get_liters']
     list_filter = ['date', 'created_at']
     search_fields = ['user__username', 'notes']
@@ -80,13 +156,16 @@ class WaterIntakeAdmin(admin.ModelAdmin):
 
 
 @admin.register(HealthGoal)
-class HealthGoalAdmin(admin.ModelAdmin):
+class HealthGoalAdmin(TrackerModelAdmin):
     list_display = ['user', 'goal_type', 'title', 'target_value', 'current_value', 'progress_percentage', 'status', 'target_date']
-    list_filter = ['goal_type', 'status', 'target_date', 'created_at']
+    list_filter = ['goal_type', 'status', ProgressFilter, 'target_date', 'created_at']
     search_fields = ['user__username', 'title', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'progress_percentage']
+    readonly_fields = ['start_value', 'created_at', 'updated_at', 'progress_percentage']
     date_hierarchy = 'target_date'
 
+    def get_queryset(self, request):
+        return with_progress(super().get_queryset(request), timezone.now().date())
+
     def progress_percentage(self, obj):
         percentage = obj.progress_percentage
         if percentage >= 80:
@@ -97,10 +176,11 @@ class HealthGoalAdmin(admin.ModelAdmin):
             color = 'red'
         return format_html('<span style="color: {};">{}%</span>', color, percentage)
     progress_percentage.short_description = 'Progress'
+    progress_percentage.admin_order_field = 'progress_percentage'
 
 
 @admin.register(Mood)
-class MoodAdmin(admin.ModelAdmin):
+class MoodAdmin(TrackerModelAdmin):
     list_display = ['user', 'get_mood_emoji', 'date', 'created_at']
     list_filter = ['mood', 'date', 'created_at']
     search_fields = ['user__username', 'notes']
@@ -114,7 +194,7 @@ class MoodAdmin(admin.ModelAdmin):
 
 
 @admin.register(Medication)
-class MedicationAdmin(admin.ModelAdmin):
+class MedicationAdmin(TrackerModelAdmin):
     list_display = ['user', 'name', 'dosage', 'frequency', 'start_date', 'end_date', 'is_active']
     list_filter = ['is_active', 'start_date', 'created_at']
     search_fields = ['user__username', 'name', 'notes']
@@ -123,9 +203,36 @@ class MedicationAdmin(admin.ModelAdmin):
 
 
 @admin.register(HealthMetric)
-class HealthMetricAdmin(admin.ModelAdmin):
+class HealthMetricAdmin(TrackerModelAdmin):
     list_display = ['user', 'metric_type', 'value', 'unit', 'date', 'created_at']
     list_filter = ['metric_type', 'date', 'created_at']
     search_fields = ['user__username', 'value', 'notes']
     readonly_fields = ['created_at']
     date_hierarchy = 'date'
+
+
+@admin.register(DailySummary)
+class DailySummaryAdmin(TrackerModelAdmin):
+    list_display = ['user', 'date', 'weight', 'mood', 'calories_burned', 'calories_consumed', 'water_amount']
+    list_filter = ['date']
+    search_fields = ['user__username']
+    readonly_fields = ['updated_at']
+    date_hierarchy = 'date'
+
+
+@admin.register(RecomputeJob)
+class RecomputeJobAdmin(TrackerModelAdmin):
+    list_display = ['user', 'source', 'date', 'status', 'attempts', 'created_at', 'claimed_at']
+    list_filter = ['status', 'source']
+    search_fields = ['user__username']
+    readonly_fields = ['created_at', 'claimed_at', 'claim', 'last_error']
+    actions = ['retry']
+
+    @admin.action(description='Queue selected failed jobs again')
+    def retry(self, request, queryset):
+        requeued = 0
+        for job in queryset.filter(status='failed'):
+            enqueue(job.user_id, apps.get_model(job.source), [job.date])
+            job.delete()
+            requeued += 1
+        self.message_user(request, f'{requeued} job(s) queued again.')
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.db.models import Count, Max, Sum
+
+from .charts import MAX_POINTS, bucketed, choose_bucket, columns, largest_triangle_three_buckets
+from .models import Exercise, Nutrition, WeightEntry
+from .trends import METRICS, latest_trends
+
+
+@dataclass(frozen=True)
+class AnalyticsSummary:
+    """Everything analytics.html shows, built once per request so the template never touches a queryset"""
+    days: int
+    start_date: date
+    end_date: date
+    bucket: str
+
+    weight_count: int = 0
+    first_weight: float = None
+    last_weight: float = None
+    weight_series: tuple = ()
+
+    workout_count: int = 0
+    latest_workout: date = None
+    exercise_series: tuple = ()
+
+    meal_count: int = 0
+    nutrition_days: int = 0
+    latest_meal: date = None
+    nutrition_series: tuple = ()
+
+    # Latest TrendPoint per logged metric, in METRICS order
+    trends: tuple = ()
+
+    @property
+    def weight_change(self):
+        if self.weight_count:
+            return self.last_weight - self.first_weight
+        return None
+
+    @property
+    def has_data(self):
+        return bool(self.weight_count or self.workout_count or self.meal_count)
+
+    def chart_data(self):
+        """The three series as parallel date/value arrays, for ``charts.json_script()``"""
+        return {
+            'weight': columns(self.weight_series, 'date', 'weight'),
+            'exercise': columns(((day, calories or 0) for day, calories in self.exercise_series), 'date', 'calories'),
+            'nutrition': columns(((day, calories or 0) for day, calories in self.nutrition_series), 'date', 'calories'),
+        }
+
+
+def _weight(user, start_date, end_date):
+    # At most one row per day (unique on user, date), so the raw series is bounded by the range.
+    points = [
+        (day.toordinal(), float(weight))
+        for day, weight in WeightEntry.objects.filter(user=user, date__range=[start_date, end_date])
+        .order_by('date').values_list('date', 'weight')
+    ]
+    if not points:
+        return {}
+    sampled = largest_triangle_three_buckets(points, MAX_POINTS)
+    return {
+        'weight_count': len(points),
+        'first_weight': points[0][1],
+        'last_weight': points[-1][1],
+        'weight_series': tuple((date.fromordinal(x), y) for x, y in sampled),
+    }
+
+
+def _exercise(user, start_date, end_date, bucket):
+    rows = list(bucketed(
+        Exercise.objects.filter(user=user, date__range=[start_date, end_date]),
+        bucket, entries=Count('id'), latest=Max('date'), calories=Sum('calories_burned'),
+    ))
+    if not rows:
+        return {}
+    return {
+        'workout_count': sum(row['entries'] for row in rows),
+        'latest_workout': rows[-1]['latest'],
+        'exercise_series': tuple((row['bucket'], row['calories']) for row in rows),
+    }
+
+
+def _nutrition(user, start_date, end_date, bucket):
+    rows = list(bucketed(
+        Nutrition.objects.filter(user=user, date__range=[start_date, end_date]),
+        bucket, entries=Count('id'), days=Count('date', distinct=True), latest=Max('date'),
+        calories=Sum('calories'),
+    ))
+    if not rows:
+        return {}
+    return {
+        'meal_count': sum(row['entries'] for row in rows),
+        'nutrition_days': sum(row['days'] for row in rows),
+        'latest_meal': rows[-1]['latest'],
+        'nutrition_series': tuple((row['bucket'], row['calories']) for row in rows),
+    }
+
+
+def _trends(user, today):
+    latest = latest_trends(user.pk, today)
+    return {'trends': tuple(latest[metric] for metric in METRICS if metric in latest)}
+
+
+def summary_queries(user, days, today):
+    """The fixed fields plus one independent query per model; each returns its share of the summary"""
+    start_date = today - timedelta(days=days)
+    bucket = choose_bucket(days)
+    fields = {'days': days, 'start_date': start_date, 'end_date': today, 'bucket': bucket}
+    return fields, [
+        lambda: _weight(user, start_date, today),
+        lambda: _exercise(user, start_date, today, bucket),
+        lambda: _nutrition(user, start_date, today, bucket),
+        lambda: _trends(user, today),
+    ]
+
+
+def build_summary(user, days, today):
+    """One query per model plus two for the precomputed trends, whatever the range"""
+    fields, queries = summary_queries(user, days, today)
+    for query in queries:
+        fields.update(query())
+    return AnalyticsSummary(**fields)
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TrackerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tracker"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if getattr(settings, 'PROFILING', False):
+            from . import profiling
+            profiling.install()
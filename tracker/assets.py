@@ -0,0 +1,131 @@
+"""Front-end bundles: every page loads one stylesheet and one script, served by WhiteNoise.
+
+Bootstrap, Bootstrap Icons and Chart.js are vendored under ``static/vendor/`` (pinned
+versions, source map comments removed). ``collectstatic`` concatenates them with the
+app's own files into the ``BUNDLES`` below, minifying whatever is not already
+minified, before the manifest storage fingerprints everything and writes gzip and
+brotli copies. WhiteNoise serves fingerprinted files with immutable cache headers.
+
+The same step works out each page template's critical CSS (tracker/critical_css.py).
+A browser that has not fetched the current stylesheet yet gets that subset inline and
+loads the full bundle without blocking rendering; once it has, a cookie tells later
+pages to just link the (cached) stylesheet.
+
+Until the bundles have been collected (``DEBUG``, tests) ``{% asset_bundle %}`` links
+the member files one by one instead.
+"""
+import json
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from django.template import engines
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .critical_css import build_critical_css
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:
+    rcssmin = rjsmin = None
+
+# bundle -> members, in load order
+BUNDLES = {
+    'dist/app.css': [
+        'vendor/bootstrap-5.3.0/bootstrap.min.css',
+        'vendor/bootstrap-icons-1.13.1/bootstrap-icons.min.css',
+        'css/style.css',
+        'css/theme.css',
+    ],
+    'dist/app.js': [
+        'vendor/popper-2.11.8/popper.min.js',
+        'vendor/bootstrap-5.3.0/bootstrap.min.js',
+        'vendor/chart.js-4.4.0/chart.umd.min.js',
+        'js/charts.js',
+        'js/infinite-scroll.js',
+    ],
+}
+
+# template name -> critical CSS for the stylesheet bundle
+CRITICAL_CSS = 'dist/critical.json'
+# Set by the browser once it has the current stylesheet bundle in its cache
+CSS_COOKIE = 'cached_css'
+
+CSS_URL = re.compile(r'''url\((\s*)(['"]?)([^'")]+)\2(\s*)\)''')
+
+
+def _rebase_urls(css, member, bundle):
+    """Point relative ``url()``s in ``member`` at the same files from the bundle's directory"""
+    def rebase(match):
+        url = match.group(3)
+        if re.match(r'^(?:[a-z]+:|/|#)', url):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(member), url))
+        return 'url({}{}{}{}{})'.format(
+            match.group(1), match.group(2), posixpath.relpath(target, posixpath.dirname(bundle)),
+            match.group(2), match.group(4),
+        )
+    return CSS_URL.sub(rebase, css)
+
+
+def build_bundle(bundle, read):
+    """Concatenate ``bundle``'s members, reading each with ``read(name) -> str``"""
+    parts = []
+    for member in BUNDLES[bundle]:
+        source = read(member)
+        minified = '.min.' in member
+        if bundle.endswith('.css'):
+            source = _rebase_urls(source, member, bundle)
+            if rcssmin and not minified:
+                source = rcssmin.cssmin(source, keep_bang_comments=True)
+        elif rjsmin and not minified:
+            source = rjsmin.jsmin(source, keep_bang_comments=True)
+        parts.append(source.strip())
+    # A script ending without a semicolon must not run into the next one.
+    return ('\n' if bundle.endswith('.css') else ';\n').join(parts) + '\n'
+
+
+def bundles_collected():
+    """True once ``collectstatic`` has written the bundles into the manifest being served"""
+    if settings.DEBUG:
+        return False
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return all(name in hashed_files for name in [*BUNDLES, CRITICAL_CSS])
+
+
+_critical_css = {}
+
+
+def critical_css(template_name):
+    """The critical CSS collectstatic built for ``template_name``, or None for templates it didn't see"""
+    stored = staticfiles_storage.stored_name(CRITICAL_CSS)
+    if stored not in _critical_css:
+        with staticfiles_storage.open(stored) as handle:
+            _critical_css[stored] = json.load(handle)
+    return _critical_css[stored].get(template_name)
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """WhiteNoise's compressed manifest storage that also builds ``BUNDLES`` and ``CRITICAL_CSS`` in collectstatic"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for bundle in BUNDLES:
+                self._write(bundle, build_bundle(bundle, self._read_text))
+            directories = [directory for engine in engines.all() for directory in engine.template_dirs]
+            critical = build_critical_css(self._read_text('dist/app.css'), directories)
+            self._write(CRITICAL_CSS, json.dumps(critical, sort_keys=True))
+            paths.update((name, (self, name)) for name in [*BUNDLES, CRITICAL_CSS])
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def _write(self, name, text):
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(text.encode()))
+
+    def _read_text(self, name):
+        with self.open(name) as handle:
+            return handle.read().decode()
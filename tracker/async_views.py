@@ -0,0 +1,115 @@
+"""Async variants of the read-heavy views, for serving under ASGI (uvicorn).
+
+Django 4.2's async ORM methods (``afirst()``, ``aaggregate()``, ``async for``) hand
+every query to the same thread-sensitive executor, so gathering them still runs
+the queries one after another. ``gather_queries()`` instead gives each independent
+query its own worker thread, and with it its own database connection, so the
+database works on them at the same time and a cache miss costs about as much as
+the slowest query rather than the sum of them.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+from . import charts
+from .analytics import AnalyticsSummary, summary_queries
+from .caching import acached
+from .views import chart_data_etag, dashboard_queries
+
+
+def login_required(view):
+    """``login_required`` for coroutine views; Django 4.2's decorator only wraps sync ones"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Loading the lazy user runs the session and user queries, so do it off the event loop.
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _on_own_connection(query):
+    def run():
+        # Worker threads aren't covered by the request_started/finished hooks that
+        # recycle connections, so honour CONN_MAX_AGE here.
+        close_old_connections()
+        try:
+            return query()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_queries(*queries):
+    """Run independent sync query callables concurrently and return their results in order.
+
+    Inside a transaction (ATOMIC_REQUESTS, tests) other connections can't see its
+    uncommitted rows, so the queries run in turn on the request's own connection.
+    """
+    in_transaction = await sync_to_async(lambda: connection.in_atomic_block)()
+    if in_transaction or not getattr(settings, 'ASYNC_QUERY_FANOUT', True):
+        return [await sync_to_async(query)() for query in queries]
+    return await asyncio.gather(*(
+        sync_to_async(_on_own_connection(query), thread_sensitive=False)() for query in queries
+    ))
+
+
+@login_required
+async def dashboard(request):
+    today = timezone.now().date()
+    user = request.user
+    
+    async def build_context():
+        queries = dashboard_queries(user, today)
+        return dict(zip(queries, await gather_queries(*queries.values())))
+    
+    context = await acached(user.pk, 'dashboard', build_context, today)
+    return await sync_to_async(render)(request, 'tracker/dashboard.html', context)
+
+
+@login_required
+async def analytics(request):
+    days = charts.parse_days(request.GET.get('days', 30))
+    today = timezone.now().date()
+    
+    async def build_summary():
+        fields, queries = summary_queries(request.user, days, today)
+        for part in await gather_queries(*queries):
+            fields.update(part)
+        return AnalyticsSummary(**fields)
+    
+    summary = await acached(request.user.pk, 'analytics', build_summary, days, today)
+    return await sync_to_async(render)(request, 'tracker/analytics.html', {
+        'summary': summary,
+        'chart_data': charts.json_script(summary.chart_data(), 'analytics-chart-data'),
+    })
+
+
+@login_required
+async def get_chart_data(request):
+    days = charts.parse_days(request.GET.get('days', 30))
+    # Normalised like the ETag, so bucket=auto, bucket= and bucket=foo share one cache entry
+    bucket = charts.choose_bucket(days, request.GET.get('bucket', 'auto'))
+    today = timezone.now().date()
+    etag = quote_etag(await sync_to_async(chart_data_etag)(request))
+    
+    # Same conditional GET handling as the sync view's @etag / @cache_control.
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        async def build_data():
+            used_bucket, queries = charts.chart_queries(request.user, days, bucket, today)
+            return {'bucket': used_bucket, **dict(zip(queries, await gather_queries(*queries.values())))}
+        
+        data = await acached(request.user.pk, 'chart_data', build_data, days, bucket, today)
+        response = HttpResponse(charts.dumps(data), content_type='application/json')
+        response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,105 @@
+from django.db import IntegrityError, transaction
+
+from .forms import QuickAddForm
+from .importers import IMPORT_FORMS, RowCleaner, refresh_after_bulk_write
+from .summaries import as_date
+
+MAX_BATCH_SIZE = 500
+
+QUICK_ADD_TYPES = [choice for choice, _ in QuickAddForm.QUICK_ADD_CHOICES]
+
+# What the single-entry quick add fills in around its one ``value``; explicit fields win.
+QUICK_ADD_DEFAULTS = {
+    'weight': ('weight', {}),
+    'exercise': ('name', {'exercise_type': 'other', 'duration': 30, 'calories_burned': 150}),
+    'nutrition': ('food_name', {'meal_type': 'snack', 'calories': 100}),
+    'water': ('amount', {}),
+    'mood': ('mood', {}),
+}
+
+
+class BatchConflict(Exception):
+    """A concurrent write took a (user, date) slot between validation and insert"""
+
+
+def _record(item):
+    value_field, defaults = QUICK_ADD_DEFAULTS[item['type']]
+    record = dict(defaults)
+    if 'value' in item:
+        record[value_field] = item['value']
+    record.update((name, value) for name, value in item.items() if name not in ('type', 'value'))
+    return record
+
+
+def log_entries(user, items, atomic=False):
+    """Validate and write a burst of quick-add entries; returns one result dict per item.
+
+    Items are ``{"type": ..., "value": ...}`` like the quick add form, optionally
+    with any of the model's own fields (date, time, notes, duration...). Valid
+    items are written with one ``bulk_create`` per model in a single transaction.
+    Weight and mood are one per day: an item whose date is already logged, or
+    repeats an earlier item's date, is rejected rather than overwriting. With
+    ``atomic`` nothing is written unless every item is valid.
+    """
+    results = []
+    cleaners = {}
+    pending = {}  # model -> [(result, instance)]
+    claimed = {}  # unique-per-day model -> dates taken earlier in this batch
+    for index, item in enumerate(items):
+        result = {'index': index}
+        results.append(result)
+        entry_type = item.get('type') if isinstance(item, dict) else None
+        if not isinstance(entry_type, str) or entry_type not in QUICK_ADD_DEFAULTS:
+            result.update(status='error', errors={'type': [f'Expected one of: {", ".join(QUICK_ADD_TYPES)}.']})
+            continue
+        result['type'] = entry_type
+        if entry_type not in cleaners:
+            cleaners[entry_type] = RowCleaner(IMPORT_FORMS[entry_type])
+        cleaner = cleaners[entry_type]
+        data, errors = cleaner.clean(_record(item))
+        if errors:
+            result.update(status='error', errors=errors)
+            continue
+        model = cleaner.model
+        instance = model(user_id=user.pk, **data)
+        if ('user', 'date') in model._meta.unique_together:
+            day = as_date(model, instance.date)
+            if day in claimed.setdefault(model, set()):
+                result.update(status='error', errors={'date': ['Another entry in this batch has the same date.']})
+                continue
+            claimed[model].add(day)
+        pending.setdefault(model, []).append((result, instance))
+
+    # One query per unique-per-day model for dates that are already logged.
+    for model, dates in claimed.items():
+        taken = set(model.objects.filter(user_id=user.pk, date__in=dates).values_list('date', flat=True))
+        kept = []
+        for result, instance in pending.get(model, []):
+            if as_date(model, instance.date) in taken:
+                result.update(status='error', errors={'date': [f'{model._meta.verbose_name.capitalize()} '
+                                                               f'already logged for this date.']})
+            else:
+                kept.append((result, instance))
+        pending[model] = kept
+
+    if atomic and any(result.get('status') == 'error' for result in results):
+        for result in results:
+            result.setdefault('status', 'skipped')
+        return results
+
+    touched = {}
+    try:
+        with transaction.atomic():
+            for model, entries in pending.items():
+                if not entries:
+                    continue
+                created = model.objects.bulk_create([instance for _, instance in entries])
+                for (result, _), instance in zip(entries, created):
+                    result.update(status='created', id=instance.pk)
+                touched[model] = {as_date(model, instance.date) for instance in created}
+    except IntegrityError as e:
+        raise BatchConflict(str(e))
+
+    if touched:
+        refresh_after_bulk_write(user.pk, touched)
+    return results
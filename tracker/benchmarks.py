@@ -0,0 +1,146 @@
+import asyncio
+import math
+import statistics
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection
+from django.template import loader
+from django.urls import reverse
+
+from . import urls
+from .models import WeightEntry
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * q / 100) - 1)]
+
+
+class QueryCounter:
+    """connection.execute_wrapper hook that only counts, so it barely moves the timings"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class TemplateTimer:
+    """Times each ``render()`` of a page template (loading, rendering and its fragments) while active"""
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+
+    def __enter__(self):
+        render_to_string = self._original = loader.render_to_string
+
+        def timed(template_name, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return render_to_string(template_name, *args, **kwargs)
+            finally:
+                name = template_name if isinstance(template_name, str) else template_name[0]
+                self.timings[name].append((time.perf_counter() - start) * 1000)
+
+        # django.shortcuts.render() looks this up on the module each call
+        loader.render_to_string = timed
+        return self
+
+    def __exit__(self, *exc_info):
+        loader.render_to_string = self._original
+
+
+def tracker_urls(user):
+    """Yield ``(view name, url)`` for every route in tracker/urls.py, filling ids from ``user``'s data"""
+    entry = WeightEntry.objects.filter(user=user).order_by('-date').first()
+    for pattern in urls.urlpatterns:
+        name = f'{urls.app_name}:{pattern.name}'
+        if pattern.pattern.converters:
+            # edit/delete confirmation pages; GET only, nothing is changed
+            if entry is not None:
+                yield name, reverse(name, args=['weight', entry.pk])
+        else:
+            yield name, reverse(name)
+
+
+def measure(client, url, iterations, warmup=1, cold=False):
+    """GET ``url`` repeatedly; returns status, p50/p95/mean latency in ms and the query count"""
+    def get():
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    for _ in range(warmup):
+        get()
+    timings, queries = [], []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = get()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+    return {
+        'url': url,
+        'status': response.status_code,
+        **latency(timings),
+        'queries': round(statistics.median(queries)),
+        'max_queries': max(queries),
+    }
+
+
+async def ameasure(client, url, iterations, warmup=1, cold=False, concurrency=1):
+    """``measure()`` through an AsyncClient (the ASGI handler), ``concurrency`` requests at a time.
+
+    Query counts are left out: fanned-out queries run on worker threads' connections.
+    """
+    for _ in range(warmup):
+        await client.get(url)
+
+    async def timed():
+        start = time.perf_counter()
+        response = await client.get(url)
+        return (time.perf_counter() - start) * 1000, response
+
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            await cache.aclear()
+        done = await asyncio.gather(*(timed() for _ in range(concurrency)))
+        timings.extend(elapsed for elapsed, _ in done)
+        response = done[-1][1]
+    return {'url': url, 'status': response.status_code, **latency(timings)}
+
+
+def latency(timings):
+    return {
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+    }
+
+
+def compare(results, baseline, threshold=1.2, min_delta_ms=1.0):
+    """List the views whose p95 grew past ``threshold`` x baseline (and ``min_delta_ms``) or that run more queries"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if (current['p95_ms'] > before['p95_ms'] * threshold
+                and current['p95_ms'] - before['p95_ms'] > min_delta_ms):
+            regressions.append({'view': name, 'metric': 'p95_ms', 'baseline': before['p95_ms'],
+                                'current': current['p95_ms']})
+        if current['queries'] > before['queries']:
+            regressions.append({'view': name, 'metric': 'queries', 'baseline': before['queries'],
+                                'current': current['queries']})
+    return regressions
@@ -0,0 +1,71 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+
+from .models import Exercise, HealthGoal, Mood, Nutrition, Sleep, WaterIntake, WeightEntry
+
+# Any write to these bumps the owner's version, orphaning every cached context built from them.
+VERSIONED_MODELS = (WeightEntry, Exercise, Nutrition, Sleep, WaterIntake, Mood, HealthGoal)
+
+
+def _version_key(user_id):
+    return f'tracker:version:{user_id}'
+
+
+def _fresh_version():
+    # Seeded from the clock rather than 1, so a version key evicted from the cache
+    # can never come back as a number older entries were stored under.
+    return time.time_ns() // 1000
+
+
+def get_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = _fresh_version()
+        cache.add(_version_key(user_id), version, timeout=None)
+        version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def _bump(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _fresh_version(), timeout=None)
+
+
+def bump_version(user_id):
+    """Invalidate everything cached for ``user_id``.
+
+    Bumped immediately so the writing request sees its own change, and again on
+    commit so a concurrent reader can't cache pre-commit data under the new version.
+    """
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id))
+
+
+def _key(user_id, version, name, parts):
+    return ':'.join(['tracker', str(user_id), str(version), name, *map(str, parts)])
+
+
+def cached(user_id, name, build, *parts, timeout=DEFAULT_TIMEOUT):
+    """Return ``build()`` from the cache under the user's current version, computing it on a miss"""
+    key = _key(user_id, get_version(user_id), name, parts)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+async def acached(user_id, name, build, *parts, timeout=DEFAULT_TIMEOUT):
+    """``cached()`` for async views: ``build`` is a coroutine function, under the same key"""
+    key = _key(user_id, await sync_to_async(get_version)(user_id), name, parts)
+    value = await cache.aget(key)
+    if value is None:
+        value = await build()
+        await cache.aset(key, value, timeout)
+    return value
@@ -0,0 +1,166 @@
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .models import Exercise, WaterIntake, WeightEntry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Upper bound on points per series returned to the browser, whatever the range.
+MAX_POINTS = 200
+MAX_DAYS = 3650
+
+BUCKETS = {
+    'day': lambda: F('date'),
+    'week': lambda: TruncWeek('date'),
+    'month': lambda: TruncMonth('date'),
+}
+BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 30}
+
+# What django.utils.html.json_script escapes, so a payload can't close its <script>
+JSON_SCRIPT_ESCAPES = {ord('>'): '\\u003E', ord('<'): '\\u003C', ord('&'): '\\u0026'}
+
+
+def parse_days(value, default=30):
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return default
+    return min(max(days, 1), MAX_DAYS)
+
+
+def _fits(days, bucket):
+    # The range runs from ``days`` ago through today
+    return days // BUCKET_DAYS[bucket] + 1 <= MAX_POINTS
+
+
+def choose_bucket(days, bucket='auto'):
+    """Return ``bucket`` if valid and within MAX_POINTS for ``days``, otherwise the finest bucket that is"""
+    if bucket in BUCKETS and _fits(days, bucket):
+        return bucket
+    for name in BUCKET_DAYS:
+        if _fits(days, name):
+            return name
+    return 'month'
+
+
+def largest_triangle_three_buckets(points, threshold):
+    """Downsample ``[(x, y), ...]`` to ``threshold`` points, keeping the visual shape (Steinarsson, 2013)"""
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third vertex of the triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(x for x, _ in next_bucket) / len(next_bucket)
+        avg_y = sum(y for _, y in next_bucket) / len(next_bucket)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best_area = -1
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area, best = area, j
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def columns(rows, *names):
+    """``{name: [values...]}`` from ``rows`` of tuples: one array per column, the shape of every chart payload"""
+    rows = list(rows)
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+
+def _encode(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """Compact JSON with dates as ISO strings and Decimals as numbers; orjson does the work when installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_encode).decode()
+    return json.dumps(data, default=_encode, separators=(',', ':'))
+
+
+def json_script(data, element_id):
+    """``django.utils.html.json_script()`` over ``dumps()``: a data island for a page's charts to read"""
+    return format_html('<script id="{}" type="application/json">{}</script>',
+                       element_id, mark_safe(dumps(data).translate(JSON_SCRIPT_ESCAPES)))
+
+
+def bucketed(queryset, bucket, **aggregates):
+    return (
+        queryset.annotate(bucket=BUCKETS[bucket]())
+        .values('bucket')
+        .annotate(**aggregates)
+        .order_by('bucket')
+    )
+
+
+def weight_series(user, start_date, end_date, bucket):
+    rows = bucketed(
+        WeightEntry.objects.filter(user=user, date__range=[start_date, end_date]),
+        bucket, weight=Avg('weight'),
+    )
+    points = [(row['bucket'].toordinal(), float(row['weight'])) for row in rows]
+    points = largest_triangle_three_buckets(points, MAX_POINTS)
+    return columns(((date.fromordinal(x), round(y, 2)) for x, y in points), 'date', 'weight')
+
+
+def exercise_series(user, start_date, end_date, bucket):
+    rows = bucketed(
+        Exercise.objects.filter(user=user, date__range=[start_date, end_date]),
+        bucket, total_duration=Sum('duration'), total_calories=Sum('calories_burned'),
+    )
+    return columns(
+        ((row['bucket'], row['total_duration'], row['total_calories']) for row in rows),
+        'date', 'total_duration', 'total_calories',
+    )
+
+
+def water_series(user, start_date, end_date, bucket):
+    rows = bucketed(
+        WaterIntake.objects.filter(user=user, date__range=[start_date, end_date]),
+        bucket, total_amount=Sum('amount'),
+    )
+    return columns(((row['bucket'], row['total_amount']) for row in rows), 'date', 'total_amount')
+
+
+def chart_queries(user, days, bucket, today):
+    """The bucket actually used, and one independent query per series"""
+    start_date = today - timedelta(days=days)
+    bucket = choose_bucket(days, bucket)
+    return bucket, {
+        'weight_data': lambda: weight_series(user, start_date, today, bucket),
+        'exercise_data': lambda: exercise_series(user, start_date, today, bucket),
+        'water_data': lambda: water_series(user, start_date, today, bucket),
+    }
+
+
+def chart_data(user, days, bucket, today):
+    bucket, queries = chart_queries(user, days, bucket, today)
+    return {'bucket': bucket, **{name: query() for name, query in queries.items()}}
@@ -0,0 +1,166 @@
+"""Correlations between a user's series: sleep vs. next-day mood, net calories vs. weight change...
+
+Every series is loaded with two ``values_list()`` queries (DailySummary columns and
+sleep nights) straight into NumPy arrays indexed by day, so a multi-year range costs
+a few milliseconds and no model instances. Days without data are NaN and each
+pair only uses the days where both sides are present.
+
+NumPy is listed in requirements.txt; without it ``AVAILABLE`` is False and the
+report page says so instead of failing.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailySummary, Sleep
+from .stats import SLEEP_DURATION
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None
+
+# Fewer paired days than this and a coefficient says more about noise than habits.
+MIN_PAIRS = 10
+
+STRENGTHS = [(0.5, 'strong'), (0.3, 'moderate'), (0.1, 'weak')]
+
+DAILY_COLUMNS = [
+    'weight', 'mood', 'meal_count', 'calories_consumed', 'calories_burned', 'exercise_minutes', 'water_amount',
+]
+
+
+@dataclass(frozen=True)
+class Correlation:
+    key: str
+    title: str
+    x_unit: str
+    y_label: str
+    period: str  # what one pair covers: 'day' or 'week'
+    pairs: int
+    r: float = None
+    slope: float = None  # change in y per x_unit
+
+    @property
+    def strength(self):
+        if self.r is None:
+            return None
+        for threshold, name in STRENGTHS:
+            if abs(self.r) >= threshold:
+                return name
+        return 'none'
+
+    @property
+    def direction(self):
+        if self.r is None or self.strength == 'none':
+            return None
+        return 'positive' if self.r > 0 else 'negative'
+
+
+@dataclass(frozen=True)
+class CorrelationReport:
+    days: int
+    start_date: date
+    end_date: date
+    correlations: tuple = ()
+
+    @property
+    def has_data(self):
+        return any(correlation.r is not None for correlation in self.correlations)
+
+
+def load_series(user, start_date, end_date):
+    """Columnar arrays aligned on ``start_date..end_date``: name -> float array with NaN for missing days"""
+    length = (end_date - start_date).days + 1
+    origin = start_date.toordinal()
+    series = {name: np.full(length, np.nan) for name in DAILY_COLUMNS + ['sleep_hours']}
+
+    rows = list(DailySummary.objects.filter(user=user, date__range=[start_date, end_date])
+                .order_by().values_list('date', *DAILY_COLUMNS))
+    if rows:
+        dates, *columns = zip(*rows)
+        index = np.fromiter((day.toordinal() - origin for day in dates), dtype=np.intp, count=len(rows))
+        for name, values in zip(DAILY_COLUMNS, columns):
+            # dtype=float turns Decimals into floats and None (no weigh-in, no mood) into NaN.
+            series[name][index] = np.array(values, dtype=float)
+
+    # Sleep counts towards the night it started, as in goal progress; naps add up.
+    tz = timezone.get_current_timezone()
+    nights = list(Sleep.objects.filter(
+        user=user,
+        sleep_time__gte=datetime.combine(start_date, time.min, tzinfo=tz),
+        sleep_time__lt=datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz),
+    ).order_by().values_list(TruncDate('sleep_time'), SLEEP_DURATION))
+    if nights:
+        count = len(nights)
+        index = np.fromiter((night.toordinal() - origin for night, _ in nights), dtype=np.intp, count=count)
+        seconds = np.fromiter((duration.total_seconds() for _, duration in nights), dtype=float, count=count)
+        logged = np.bincount(index, minlength=length) > 0
+        series['sleep_hours'][logged] = np.bincount(index, weights=seconds, minlength=length)[logged] / 3600
+    return series
+
+
+def _derived(series):
+    # Zero columns are only zero on days with a summary row; days without meals are unknown, not fasting.
+    return {
+        'net_calories': np.where(series['meal_count'] > 0,
+                                 series['calories_consumed'] - series['calories_burned'], np.nan),
+        'water': np.where(series['water_amount'] > 0, series['water_amount'], np.nan),
+    }
+
+
+def _next_day(values):
+    shifted = np.full_like(values, np.nan)
+    shifted[:-1] = values[1:]
+    return shifted
+
+
+def _weekly_mean(values):
+    """Means of whole 7-day blocks, aligned so the last block ends on the last day"""
+    blocks = values[len(values) % 7:].reshape(-1, 7)
+    counts = (~np.isnan(blocks)).sum(axis=1)
+    totals = np.nansum(blocks, axis=1)
+    return np.divide(totals, counts, out=np.full(len(blocks), np.nan), where=counts > 0)
+
+
+def pearson(x, y):
+    """``(pairs, r, slope)`` over the positions where both are present; r and slope are None below MIN_PAIRS"""
+    both = ~(np.isnan(x) | np.isnan(y))
+    pairs = int(both.sum())
+    if pairs < MIN_PAIRS:
+        return pairs, None, None
+    x, y = x[both] - x[both].mean(), y[both] - y[both].mean()
+    sxx, syy, sxy = (x * x).sum(), (y * y).sum(), (x * y).sum()
+    if not sxx or not syy:
+        return pairs, None, None  # one side never varies
+    return pairs, round(float(sxy / np.sqrt(sxx * syy)), 3), round(float(sxy / sxx), 4)
+
+
+def build_report(user, days, today):
+    start_date = today - timedelta(days=days)
+    series = load_series(user, start_date, today)
+    series.update(_derived(series))
+
+    weekly_weight = _weekly_mean(series['weight'])
+    pairs = [
+        ('sleep_mood', 'Sleep and next-day mood', 'hour slept', 'mood points the next day', 'day',
+         series['sleep_hours'], _next_day(series['mood'])),
+        ('calories_weight', 'Net calories and weekly weight change', 'net calorie a day',
+         "kg change in the next week's average weight", 'week',
+         _weekly_mean(series['net_calories']), _next_day(weekly_weight) - weekly_weight),
+        ('water_mood', 'Water and mood', 'ml of water', 'mood points the same day', 'day',
+         series['water'], series['mood']),
+        ('exercise_sleep', "Exercise and that night's sleep", 'minute exercised', 'hours slept that night', 'day',
+         series['exercise_minutes'], series['sleep_hours']),
+    ]
+    return CorrelationReport(
+        days=days, start_date=start_date, end_date=today,
+        correlations=tuple(
+            Correlation(key, title, x_unit, y_label, period, *pearson(x, y))
+            for key, title, x_unit, y_label, period, x, y in pairs
+        ),
+    )
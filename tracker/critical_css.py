@@ -0,0 +1,180 @@
+"""Per-template critical CSS: the rules of the stylesheet bundle that style the top of each page.
+
+A page's "top" is the markup of base.html before ``{% block content %}`` (navbar,
+messages) plus the first ``ABOVE_THE_FOLD`` characters of the template's own content
+block. Every class, id, tag and attribute name written there is collected, and a rule
+is kept when all of those its selector needs are present. Interaction states
+(``:hover``, ``:focus``...), animations, ``@font-face`` and rules that load
+files are left to the full stylesheet.
+
+This is a static approximation, not a layout engine: it can keep a rule that ends
+up below the fold, or miss one for markup produced by an ``{% include %}`` or a
+variable. Either way the full stylesheet arrives right after the first paint.
+"""
+import re
+from pathlib import Path
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+BASE_TEMPLATE = 'tracker/base.html'
+ABOVE_THE_FOLD = 3000
+
+ALWAYS_PRESENT = {'html', 'body', 'head'}
+GROUPING_RULES = ('@media', '@supports')
+STATE_PSEUDO_CLASS = re.compile(
+    r':(?:hover|focus|focus-visible|focus-within|active|visited|checked|disabled|invalid|valid|'
+    r'indeterminate|autofill|placeholder-shown|target|empty)\b'
+)
+LOADS_FILE = re.compile(r'''url\(\s*['"]?(?!data:)''')
+STRING = re.compile(r'''"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*\'''')
+COMMENT = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.S)
+TEMPLATE_SYNTAX = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+CONTENT_BLOCK = re.compile(r'{%\s*block content\s*%}')
+EXTENDS_BASE = re.compile(r'''{%\s*extends\s+['"]''' + re.escape(BASE_TEMPLATE) + r'''['"]\s*%}''')
+
+
+def _skip_string(css, pos):
+    match = STRING.match(css, pos)
+    return match.end() if match else len(css)
+
+
+def _block_end(css, pos):
+    """Index of the ``}`` closing the block whose body starts at ``pos``"""
+    depth = 0
+    while pos < len(css):
+        char = css[pos]
+        if char in '"\'':
+            pos = _skip_string(css, pos)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            if not depth:
+                return pos
+            depth -= 1
+        pos += 1
+    return pos
+
+
+def _parse(css, pos=0):
+    rules, start = [], pos
+    while pos < len(css):
+        char = css[pos]
+        if char in '"\'':
+            pos = _skip_string(css, pos)
+        elif char == ';':
+            # @charset, @import: statements without a block
+            pos = start = pos + 1
+        elif char == '}':
+            return rules, pos + 1
+        elif char == '{':
+            prelude = css[start:pos].strip()
+            if prelude.startswith(GROUPING_RULES):
+                children, pos = _parse(css, pos + 1)
+                rules.append((prelude, children))
+            else:
+                end = _block_end(css, pos + 1)
+                rules.append((prelude, css[pos + 1:end].strip()))
+                pos = end + 1
+            start = pos
+        else:
+            pos += 1
+    return rules, pos
+
+
+def parse_rules(css):
+    """``[(prelude, declarations or [nested rules])]`` for a stylesheet, comments dropped"""
+    return _parse(COMMENT.sub(lambda match: match.group(1) or '', css))[0]
+
+
+class Markup:
+    """The class names, ids, tag names and attribute names written in a chunk of template source"""
+
+    def __init__(self, source):
+        tags = re.findall(r'<([a-zA-Z][\w-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>', source)
+        self.tags = ALWAYS_PRESENT | {name.lower() for name, _ in tags}
+        self.attributes = {name.lower() for _, attributes in tags
+                           for name in re.findall(r'([a-zA-Z][\w:-]*)\s*=', attributes)}
+        self.classes = {token for value in re.findall(r'class="([^"]*)"', source)
+                        for token in TEMPLATE_SYNTAX.sub(' ', value).split()
+                        if re.fullmatch(r'-?[A-Za-z_][\w-]*', token) and not token.endswith('-')}
+        self.ids = set(re.findall(r'\sid="([\w-]+)"', source))
+
+    def matches(self, selector):
+        if STATE_PSEUDO_CLASS.search(selector):
+            return False
+        selector = re.sub(r':not\([^)]*\)', '', selector)
+        if not set(re.findall(r'\[\s*([\w-]+)', selector)) <= self.attributes:
+            return False
+        selector = re.sub(r'\[[^\]]*\]', '', selector)
+        selector = re.sub(r'::?[\w-]+(?:\([^)]*\))?', '', selector)
+        if not set(re.findall(r'\.(-?[A-Za-z_][\w-]*)', selector)) <= self.classes:
+            return False
+        if not set(re.findall(r'#([\w-]+)', selector)) <= self.ids:
+            return False
+        compounds = re.split(r'\s*[>+~]\s*|\s+', selector.strip())
+        tags = {match.group(0).lower() for match in map(re.compile(r'[a-zA-Z][\w-]*').match, compounds) if match}
+        return tags <= self.tags
+
+
+def select_rules(rules, markup):
+    """CSS text of the ``rules`` that style ``markup``"""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = select_rules(body, markup)
+            if inner:
+                kept.append(f'{prelude}{{{inner}}}')
+        elif not prelude.startswith('@') and not LOADS_FILE.search(body):
+            selectors = [selector for selector in split_selectors(prelude) if markup.matches(selector)]
+            if selectors:
+                kept.append(f'{",".join(selectors)}{{{body}}}')
+    return ''.join(kept)
+
+
+def split_selectors(prelude):
+    """A selector list's selectors; commas inside ``:not(...)`` or ``[...]`` don't split"""
+    selectors, depth, start = [], 0, 0
+    for pos, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and not depth:
+            selectors.append(prelude[start:pos].strip())
+            start = pos + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def above_the_fold(base_source, source):
+    """Template source that renders the top of the page: base.html's header and the start of ``content``"""
+    header = CONTENT_BLOCK.split(base_source, 1)[0]
+    content = CONTENT_BLOCK.split(source, 1)
+    return header + (content[1][:ABOVE_THE_FOLD] if len(content) > 1 else '')
+
+
+def page_templates(directories):
+    """``{name: source}`` of every template that extends base.html"""
+    found = {}
+    for directory in map(Path, directories):
+        for path in sorted(directory.rglob('*.html')):
+            source = path.read_text()
+            if EXTENDS_BASE.search(source):
+                found.setdefault(path.relative_to(directory).as_posix(), source)
+    return found
+
+
+def build_critical_css(css, directories):
+    """``{template name: critical CSS}`` for the templates under ``directories`` that extend base.html"""
+    rules = parse_rules(css)
+    base_source = next((directory / BASE_TEMPLATE).read_text() for directory in map(Path, directories)
+                       if (directory / BASE_TEMPLATE).exists())
+    critical = {}
+    for name, source in page_templates(directories).items():
+        selected = select_rules(rules, Markup(above_the_fold(base_source, source)))
+        critical[name] = rcssmin.cssmin(selected) if rcssmin else selected
+    return critical
@@ -0,0 +1,92 @@
+import csv
+import io
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .importers import IMPORT_FORMS
+
+EXPORT_FORMATS = ['zip', 'ndjson', 'csv']
+CHUNK_SIZE = 2000
+
+
+def export_fields(model_name):
+    # Same columns the importer reads, so an export can be imported elsewhere as-is.
+    return list(IMPORT_FORMS[model_name]._meta.fields) + ['created_at']
+
+
+def iter_rows(user, model_name):
+    """Stream ``(value, ...)`` tuples for one model without building model instances"""
+    model = IMPORT_FORMS[model_name]._meta.model
+    return (
+        model.objects.filter(user=user).order_by('pk')
+        .values_list(*export_fields(model_name)).iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back each line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(user, model_name):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(export_fields(model_name))
+    for row in iter_rows(user, model_name):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(user, model_names):
+    encoder = DjangoJSONEncoder()
+    for model_name in model_names:
+        fields = export_fields(model_name)
+        for row in iter_rows(user, model_name):
+            yield encoder.encode({'model': model_name, **dict(zip(fields, row))}) + '\n'
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable sink for ZipFile; the generator drains whatever was written after each step"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(user, model_names):
+    """Yield a zip of one CSV per model as it is compressed; nothing is buffered beyond a chunk"""
+    sink = _ZipStream()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for model_name in model_names:
+            with archive.open(f'{model_name}.csv', 'w', force_zip64=True) as member:
+                for line in iter_csv(user, model_name):
+                    member.write(line.encode())
+                    if len(sink.chunks) > 16:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_export(user, fmt, model_names):
+    if fmt == 'csv':
+        (model_name,) = model_names
+        return (line.encode() for line in iter_csv(user, model_name))
+    if fmt == 'ndjson':
+        return (line.encode() for line in iter_ndjson(user, model_names))
+    return iter_zip(user, model_names)
+
+
+def content_type(fmt):
+    return {'csv': 'text/csv', 'ndjson': 'application/x-ndjson', 'zip': 'application/zip'}[fmt]
@@ -206,3 +206,34 @@ class QuickAddForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Optional notes...'})
     )
+
+
+class ImportForm(forms.Form):
+    IMPORT_CHOICES = [
+        ('weight', 'Weight Entries'),
+        ('exercise', 'Exercises'),
+        ('nutrition', 'Nutrition'),
+        ('sleep', 'Sleep'),
+        ('water', 'Water Intake'),
+        ('mood', 'Mood'),
+        ('goal', 'Goals'),
+        ('medication', 'Medications'),
+        ('metric', 'Health Metrics'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV (header row with field names)'),
+        ('json', 'JSON (array of objects or one object per line)'),
+    ]
+
+    model_name = forms.ChoiceField(
+        choices=IMPORT_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    file_format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json,.jsonl,.ndjson'})
+    )
@@ -0,0 +1,172 @@
+from decimal import Decimal
+
+from django.db.models import (
+    Avg, BooleanField, Case, DecimalField, DurationField, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Sum, Value,
+    When,
+)
+from django.db.models.functions import Cast, Greatest, Least, Round
+from django.utils import timezone
+
+from .models import DailySummary, Exercise, HealthGoal, Nutrition, Sleep, WaterIntake, WeightEntry
+from .stats import SLEEP_DURATION, hours
+from .summaries import as_date
+
+# Tracker model -> the goal_type its entries count towards. 'general' goals have
+# no source and keep whatever current_value was entered by hand.
+GOAL_SOURCES = {
+    WeightEntry: 'weight',
+    Exercise: 'exercise',
+    Nutrition: 'nutrition',
+    Sleep: 'sleep',
+    WaterIntake: 'water',
+}
+
+TRACKED_GOAL_TYPES = list(GOAL_SOURCES.values())
+
+CENTS = Decimal('0.01')
+
+# Weight goals go down as often as up: the share of the way from start_value to
+# target_value covered so far, 0 when moving away from it.
+WEIGHT_PROGRESS = Case(
+    When(start_value=F('target_value'), then=Case(
+        When(current_value=F('target_value'), then=Value(100.0)), default=Value(0.0), output_field=FloatField(),
+    )),
+    When(
+        start_value__isnull=False, target_value__isnull=False,
+        then=Greatest(Least(
+            Round(Cast(F('start_value') - F('current_value'), FloatField()) * 100
+                  / Cast(F('start_value') - F('target_value'), FloatField()), 1),
+            Value(100.0),
+        ), Value(0.0)),
+    ),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+# Otherwise current_value as a share of target_value; capped at 100 and rounded to 0.1.
+PROGRESS_PERCENTAGE = Case(
+    When(goal_type='weight', then=WEIGHT_PROGRESS),
+    When(
+        target_value__gt=0, current_value__gt=0,
+        then=Least(Round(Cast('current_value', FloatField()) * 100 / F('target_value'), 1), Value(100.0)),
+    ),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+
+def _window(queryset, field='date'):
+    return queryset.filter(
+        user_id=OuterRef('user_id'),
+        **{f'{field}__gte': OuterRef('start_date'), f'{field}__lte': OuterRef('target_date')},
+    ).order_by()
+
+
+def _total(queryset, expression, output_field):
+    # Aggregate the whole window into a single-row subquery.
+    return Subquery(
+        queryset.values('user_id').annotate(value=expression).values('value')[:1],
+        output_field=output_field,
+    )
+
+
+def _only_for(goal_type, subquery):
+    # The CASE keeps the database from evaluating the other types' subqueries for this goal.
+    return Case(When(goal_type=goal_type, then=subquery), default=None, output_field=subquery.output_field)
+
+
+def _progress_annotations(goal_types):
+    """goal_type -> per-goal value over the goal's start_date..target_date window.
+
+    weight     latest weigh-in (kg)
+    exercise   total minutes exercised
+    nutrition  average calories per day with meals logged
+    sleep      average hours per night, by the date the night started
+    water      average ml per day with water logged
+    """
+    # Built lazily: a signal only needs its own type's subquery, and compiling all five per save adds up.
+    builders = {
+        'weight': lambda: Subquery(
+            _window(WeightEntry.objects.all()).order_by('-date').values('weight')[:1],
+            output_field=DecimalField(),
+        ),
+        'exercise': lambda: _total(_window(Exercise.objects.all()), Sum('duration'), DecimalField()),
+        'nutrition': lambda: _total(
+            _window(DailySummary.objects.filter(meal_count__gt=0)), Avg('calories_consumed'), DecimalField(),
+        ),
+        'sleep': lambda: _total(
+            _window(Sleep.objects.all(), 'sleep_time__date'),
+            Avg(SLEEP_DURATION),
+            DurationField(),
+        ),
+        'water': lambda: _total(
+            _window(DailySummary.objects.filter(water_amount__gt=0)), Avg('water_amount'), DecimalField(),
+        ),
+    }
+    return {goal_type: builders[goal_type]() for goal_type in goal_types if goal_type in builders}
+
+
+def _as_value(goal_type, value):
+    if value is None:
+        return Decimal(0)
+    if goal_type == 'sleep':
+        value = hours(value)
+    return Decimal(str(value)).quantize(CENTS)
+
+
+def evaluate_goals(goals, goal_types=None):
+    """Yield ``(goal, computed current_value, computed start_value)`` for tracked goals, in one query.
+
+    ``start_value`` is only tracked for weight goals and is None for the rest, or
+    while the window has no weigh-in.
+    """
+    goal_types = TRACKED_GOAL_TYPES if goal_types is None else goal_types
+    annotations = {
+        f'computed_{goal_type}': _only_for(goal_type, subquery)
+        for goal_type, subquery in _progress_annotations(goal_types).items()
+    }
+    if 'weight' in goal_types:
+        annotations['computed_start'] = _only_for('weight', Subquery(
+            _window(WeightEntry.objects.all()).order_by('date').values('weight')[:1],
+            output_field=DecimalField(),
+        ))
+    for goal in goals.filter(goal_type__in=goal_types).annotate(**annotations):
+        start = getattr(goal, 'computed_start', None)
+        yield (goal, _as_value(goal.goal_type, getattr(goal, f'computed_{goal.goal_type}')),
+               None if start is None else _as_value('weight', start))
+
+
+def refresh_goal_progress(user_id, goal_types=None, day=None, goals=None):
+    """Recompute ``current_value`` (and ``start_value``) for a user's active goals and save the ones that moved.
+
+    Narrow the work with ``goal_types`` and ``day`` (only goals whose window covers
+    it), as the entry signals do. Returns the number of goals updated.
+    """
+    if goals is None:
+        goals = HealthGoal.objects.filter(user_id=user_id, status='active')
+    if day is not None:
+        goals = goals.filter(start_date__lte=day, target_date__gte=day)
+
+    changed = []
+    for goal, value, start in evaluate_goals(goals.order_by(), goal_types):
+        if (goal.current_value, goal.start_value) != (value, start):
+            goal.current_value, goal.start_value = value, start
+            changed.append(goal)
+    # bulk_update skips save() and its signals, so this never re-triggers itself.
+    HealthGoal.objects.bulk_update(changed, ['current_value', 'start_value'])
+    return len(changed)
+
+
+def entry_day(sender, instance):
+    """The date an entry counts towards goals on; sleep belongs to the night it started"""
+    if sender is Sleep:
+        return timezone.localdate(instance.sleep_time)
+    return as_date(sender, instance.date)
+
+
+def with_progress(goals, today):
+    """Annotate ``progress_percentage`` and ``is_overdue`` so templates never compute them per goal"""
+    return goals.annotate(
+        progress_percentage=PROGRESS_PERCENTAGE,
+        is_overdue=ExpressionWrapper(Q(status='active', target_date__lt=today), output_field=BooleanField()),
+    )
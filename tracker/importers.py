@@ -0,0 +1,206 @@
+import csv
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .caching import bump_version
+from .forms import (
+    ExerciseForm, HealthGoalForm, HealthMetricForm, MedicationForm, MoodForm, NutritionForm, SleepForm,
+    WaterIntakeForm, WeightEntryForm,
+)
+from .goal_progress import GOAL_SOURCES, refresh_goal_progress
+from .models import HealthGoal
+from .summaries import SUMMARY_SOURCES, as_date, rebuild_daily_summaries
+from .trends import TREND_SOURCES, refresh_trends
+
+IMPORT_FORMS = {
+    'weight': WeightEntryForm,
+    'exercise': ExerciseForm,
+    'nutrition': NutritionForm,
+    'sleep': SleepForm,
+    'water': WaterIntakeForm,
+    'mood': MoodForm,
+    'goal': HealthGoalForm,
+    'medication': MedicationForm,
+    'metric': HealthMetricForm,
+}
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+_JSON_SEPARATORS = re.compile(r'[\s,\[\]]*')
+
+
+def iter_csv_records(stream):
+    """Yield one dict per CSV row; ``stream`` is a text file opened with ``newline=''``"""
+    yield from csv.DictReader(stream)
+
+
+def iter_json_records(stream, chunk_size=64 * 1024):
+    """Yield objects from a JSON array or a JSON Lines stream, reading ``chunk_size`` characters at a time"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    while True:
+        pos = _JSON_SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield record
+                continue
+        elif eof:
+            return
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def iter_records(stream, fmt):
+    if fmt == 'json':
+        return iter_json_records(stream)
+    return iter_csv_records(stream)
+
+
+class RowCleaner:
+    """Validate raw rows with a tracker ModelForm's own fields and rules.
+
+    Building a bound ModelForm per row costs a deep copy of every field, which
+    dominates large imports. This cleans each value with the form's fields, runs
+    the model field validators ModelForm would run, then the form's ``clean()``
+    for cross-field rules (e.g. wake time after sleep time). The per-row unique
+    check is skipped because the importer upserts instead.
+    """
+
+    def __init__(self, form_class):
+        self.form = form_class()
+        self.model = form_class._meta.model
+        self.model_fields = {name: self.model._meta.get_field(name) for name in self.form.fields}
+
+    @staticmethod
+    def _to_python(form_field, raw):
+        # Locale-aware date parsing is the slowest step per row; exported data is nearly always ISO.
+        if raw and type(form_field) is forms.DateField:
+            try:
+                return date.fromisoformat(raw)
+            except (TypeError, ValueError):
+                pass
+        return form_field.clean(raw)
+
+    def clean(self, record):
+        data, errors = {}, {}
+        for name, form_field in self.form.fields.items():
+            model_field = self.model_fields[name]
+            if record.get(name) in (None, '') and model_field.has_default():
+                continue  # fall back to the model default, e.g. date=today
+            try:
+                value = self._to_python(form_field, record.get(name))
+                if value not in form_field.empty_values:
+                    model_field.run_validators(value)
+                data[name] = value
+            except ValidationError as e:
+                errors[name] = e.messages
+        if not errors:
+            self.form.cleaned_data = data
+            try:
+                self.form.clean()
+            except forms.ValidationError as e:
+                errors['__all__'] = e.messages
+        return data, errors
+
+
+def refresh_after_bulk_write(user_id, touched):
+    """Bring derived data up to date after ``bulk_create``, which sends no signals.
+
+    ``touched`` maps each written model to the dates it wrote.
+    """
+    dates = set().union(*(touched[model] for model in touched if model in SUMMARY_SOURCES))
+    rebuild_daily_summaries(user_id, dates)
+    goal_types = [GOAL_SOURCES[model] for model in touched if model in GOAL_SOURCES]
+    if HealthGoal in touched:
+        # New goals start at current_value 0; evaluate every type against existing entries.
+        refresh_goal_progress(user_id)
+    elif goal_types:
+        refresh_goal_progress(user_id, goal_types)
+    trended = [model for model in touched if model in TREND_SOURCES and touched[model]]
+    if trended:
+        since = min(min(touched[model]) for model in trended)
+        refresh_trends(user_id, since, [TREND_SOURCES[model] for model in trended])
+    bump_version(user_id)
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, errors))
+
+
+class Importer:
+    """Stream validated rows into one tracker model with batched ``bulk_create``.
+
+    Each batch is written in its own transaction. Models unique on (user, date)
+    are upserted, last row wins. Signals don't fire for bulk writes, so the
+    affected daily summaries and goal progress are rebuilt and the user's cache
+    version is bumped once at the end.
+    """
+
+    def __init__(self, user, model_name, batch_size=DEFAULT_BATCH_SIZE):
+        self.user = user
+        self.cleaner = RowCleaner(IMPORT_FORMS[model_name])
+        self.model = self.cleaner.model
+        self.batch_size = batch_size
+        self.upsert = ('user', 'date') in self.model._meta.unique_together
+        self.touched_dates = set()
+
+    def run(self, records):
+        result = ImportResult()
+        batch = []
+        # Rows are numbered from 1, not counting a CSV header.
+        for line, record in enumerate(records, start=1):
+            if not isinstance(record, dict):
+                result.add_error(line, {'__all__': ['Expected an object with one key per field.']})
+                continue
+            data, errors = self.cleaner.clean(record)
+            if errors:
+                result.add_error(line, errors)
+                continue
+            batch.append(self.model(user_id=self.user.pk, **data))
+            if len(batch) >= self.batch_size:
+                result.imported += self._write(batch)
+                batch = []
+        if batch:
+            result.imported += self._write(batch)
+
+        if result.imported:
+            refresh_after_bulk_write(self.user.pk, {self.model: self.touched_dates})
+        return result
+
+    def _write(self, batch):
+        if self.upsert:
+            batch = list({as_date(self.model, entry.date): entry for entry in batch}.values())
+        if self.model in SUMMARY_SOURCES:
+            self.touched_dates.update(as_date(self.model, entry.date) for entry in batch)
+        with transaction.atomic():
+            if self.upsert:
+                self.model.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=['user', 'date'],
+                    update_fields=[name for name in self.cleaner.form.fields if name != 'date'],
+                )
+            else:
+                self.model.objects.bulk_create(batch)
+        return len(batch)
@@ -0,0 +1,134 @@
+"""Database-backed queue that moves derived-data refreshes out of the request.
+
+With ``BACKGROUND_JOBS`` on, the entry signals only record which (user, model, day)
+changed as a ``RecomputeJob``. ``manage.py run_worker`` claims the pending jobs a
+user at a time and brings daily summaries, goal progress and trends up to date
+with the same grouped refresh the importer uses, then bumps the user's cache
+version. Entries are still written, and caches invalidated, inside the request.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core import checks
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .goal_progress import GOAL_SOURCES
+from .importers import refresh_after_bulk_write
+from .models import RecomputeJob
+from .summaries import SUMMARY_SOURCES
+
+logger = logging.getLogger(__name__)
+
+# Models whose writes feed summaries, goals or trends
+QUEUED_SOURCES = set(SUMMARY_SOURCES) | set(GOAL_SOURCES)
+
+MAX_ATTEMPTS = 5
+# A job still running after this long belonged to a worker that died.
+STALE_AFTER = timedelta(minutes=5)
+
+
+def enabled():
+    return getattr(settings, 'BACKGROUND_JOBS', False)
+
+
+def enqueue(user_id, model, dates):
+    """Queue a refresh of ``model``'s derived data on ``dates``; days already pending are skipped"""
+    RecomputeJob.objects.bulk_create(
+        [RecomputeJob(user_id=user_id, source=model._meta.label_lower, date=day) for day in dates],
+        ignore_conflicts=True,
+    )
+
+
+def _release(jobs, error):
+    """Put failed or abandoned jobs back in the queue, or park them once out of attempts"""
+    for job in jobs:
+        if job.attempts >= MAX_ATTEMPTS:
+            RecomputeJob.objects.filter(pk=job.pk).update(status='failed', last_error=error)
+            continue
+        try:
+            with transaction.atomic():
+                RecomputeJob.objects.filter(pk=job.pk).update(
+                    status='pending', claim='', claimed_at=None, last_error=error,
+                )
+        except IntegrityError:
+            # The day was queued again meanwhile; that job covers this one.
+            RecomputeJob.objects.filter(pk=job.pk).delete()
+
+
+def requeue_stale():
+    stale = list(RecomputeJob.objects.filter(status='running', claimed_at__lt=timezone.now() - STALE_AFTER))
+    if stale:
+        logger.warning('Requeueing %d recompute jobs abandoned by a worker', len(stale))
+        _release(stale, 'Abandoned by a worker')
+    return len(stale)
+
+
+def claim(users=10):
+    """Mark every pending job of up to ``users`` users as running; returns ``{user_id: [jobs]}``.
+
+    Users that already have a job running are skipped, so two workers never
+    refresh the same user at once. The status check in the UPDATE means each job
+    is claimed by exactly one worker even without row locks (SQLite).
+    """
+    busy = RecomputeJob.objects.filter(status='running').values('user_id')
+    user_ids = []
+    for user_id in (RecomputeJob.objects.filter(status='pending').exclude(user_id__in=busy)
+                    .order_by('created_at').values_list('user_id', flat=True)[:users * 50]):
+        if user_id not in user_ids:
+            user_ids.append(user_id)
+            if len(user_ids) == users:
+                break
+    if not user_ids:
+        return {}
+
+    token = uuid.uuid4().hex
+    RecomputeJob.objects.filter(status='pending', user_id__in=user_ids).update(
+        status='running', claim=token, claimed_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+    claimed = {}
+    for job in RecomputeJob.objects.filter(claim=token, status='running'):
+        claimed.setdefault(job.user_id, []).append(job)
+    return claimed
+
+
+def process(user_id, jobs):
+    """Refresh everything derived from the days in ``jobs`` and drop them; failures go back in the queue"""
+    touched = {}
+    for job in jobs:
+        touched.setdefault(apps.get_model(job.source), set()).add(job.date)
+    try:
+        with transaction.atomic():
+            refresh_after_bulk_write(user_id, touched)
+            RecomputeJob.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+    except Exception as e:
+        logger.exception('Recompute for user %s failed', user_id)
+        _release(jobs, f'{type(e).__name__}: {e}')
+        return False
+    return True
+
+
+def run_pending(users=10):
+    """Claim and process one batch of users; returns the number of jobs it finished"""
+    requeue_stale()
+    done = 0
+    for user_id, jobs in claim(users).items():
+        if process(user_id, jobs):
+            done += len(jobs)
+    return done
+
+
+@checks.register()
+def check_shared_cache(app_configs, **kwargs):
+    if enabled() and settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return [checks.Warning(
+            'BACKGROUND_JOBS is on but the cache is local to each process, so pages cached by the '
+            'web server are not invalidated when the worker finishes.',
+            hint='Set CACHE_BACKEND=file (or another shared cache).',
+            id='tracker.W001',
+        )]
+    return []
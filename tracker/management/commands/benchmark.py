@@ -0,0 +1,98 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from tracker.benchmarks import compare, measure, tracker_urls
+from tracker.importers import IMPORT_FORMS
+
+
+class Command(BaseCommand):
+    help = ('Time every tracker view through the test client as a given user and report p50/p95 latency '
+            'and query counts as JSON, optionally against a stored baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='bench_1',
+                            help='User to browse as (see generate_synthetic_data)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view first')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every timed request')
+        parser.add_argument('--views', nargs='+', metavar='NAME',
+                            help='Only these views, e.g. tracker:dashboard tracker:analytics')
+        parser.add_argument('-o', '--output', help='Write the JSON report here (default: stdout)')
+        parser.add_argument('--baseline', help='Earlier report to compare against')
+        parser.add_argument('--threshold', type=float, default=1.2,
+                            help='p95 ratio over baseline that counts as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help='Exit non-zero when anything regressed against --baseline')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist; run generate_synthetic_data first")
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['views']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Could not read baseline {options["baseline"]}: {e}')
+
+        urls = list(tracker_urls(user))
+        if options['views']:
+            urls = [(name, url) for name, url in urls if name in options['views']]
+            if not urls:
+                raise CommandError('None of --views match a tracker URL name')
+
+        client = Client()
+        client.force_login(user)
+        results = {}
+        # The test client talks to 'testserver' over http.
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS], SECURE_SSL_REDIRECT=False):
+            for name, url in urls:
+                results[name] = measure(client, url, options['iterations'], options['warmup'], options['cold'])
+                self.stderr.write(
+                    f'{name:<28} {results[name]["p50_ms"]:>9.2f} ms p50 {results[name]["p95_ms"]:>9.2f} ms p95 '
+                    f'{results[name]["queries"]:>4} queries'
+                )
+
+        report = {
+            'meta': {
+                'generated_at': timezone.now().isoformat(),
+                'username': user.username,
+                'rows': {
+                    name: form._meta.model.objects.filter(user=user).count()
+                    for name, form in IMPORT_FORMS.items()
+                },
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'cold_cache': options['cold'],
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+            },
+            'views': results,
+        }
+        if baseline is not None:
+            report['regressions'] = compare(results, baseline, options['threshold'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        for regression in report.get('regressions', []):
+            self.stderr.write(self.style.WARNING(
+                f'{regression["view"]}: {regression["metric"]} {regression["baseline"]} -> {regression["current"]}'
+            ))
+        if options['fail_on_regression'] and report.get('regressions'):
+            raise CommandError(f'{len(report["regressions"])} regressions against {options["baseline"]}')
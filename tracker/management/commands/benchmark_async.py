@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from tracker.benchmarks import ameasure, measure
+
+# (sync view, its async variant, query string)
+PAIRS = [
+    ('tracker:dashboard', 'tracker:dashboard_async', ''),
+    ('tracker:analytics', 'tracker:analytics_async', '?days=365'),
+    ('tracker:chart_data', 'tracker:chart_data_async', '?days=365'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compare the sync views under WSGI with their async variants under ASGI (tracker/async_views.py), '
+            'reporting p50/p95 latency per pair as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='bench_1',
+                            help='User to browse as (see generate_synthetic_data)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view first')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the view cache between requests (default: clear it, so queries run)')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Simultaneous requests per iteration on the ASGI side')
+        parser.add_argument('-o', '--output', help='Write the JSON report here (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist; run generate_synthetic_data first")
+
+        cold = not options['warm_cache']
+        sync_client, async_client = Client(), AsyncClient()
+        sync_client.force_login(user)
+        async_client.force_login(user)
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS], SECURE_SSL_REDIRECT=False):
+            for sync_name, async_name, query in PAIRS:
+                wsgi = measure(sync_client, reverse(sync_name) + query, options['iterations'], options['warmup'], cold)
+                asgi = asyncio.run(ameasure(
+                    async_client, reverse(async_name) + query, options['iterations'], options['warmup'], cold,
+                    options['concurrency'],
+                ))
+                results[sync_name] = {
+                    'wsgi': wsgi,
+                    'asgi': asgi,
+                    'p50_speedup': round(wsgi['p50_ms'] / asgi['p50_ms'], 2) if asgi['p50_ms'] else None,
+                }
+                self.stderr.write(
+                    f'{sync_name:<20} wsgi {wsgi["p50_ms"]:>8.2f} ms p50  asgi {asgi["p50_ms"]:>8.2f} ms p50  '
+                    f'({results[sync_name]["p50_speedup"]}x)'
+                )
+
+        report = {
+            'meta': {
+                'generated_at': timezone.now().isoformat(),
+                'username': user.username,
+                'iterations': options['iterations'],
+                'cold_cache': cold,
+                'concurrency': options['concurrency'],
+                'fanout': getattr(settings, 'ASYNC_QUERY_FANOUT', True),
+                'database': connection.vendor,
+            },
+            'views': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
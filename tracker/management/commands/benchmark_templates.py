@@ -0,0 +1,103 @@
+import copy
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from tracker.benchmarks import TemplateTimer, latency, tracker_urls
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+def uncached_templates():
+    """settings.TEMPLATES with the cached loader unwrapped, so every render loads and parses again"""
+    templates = copy.deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        loaders = engine.get('OPTIONS', {}).get('loaders', [])
+        engine['OPTIONS']['loaders'] = [
+            inner for loader in loaders
+            for inner in (loader[1] if isinstance(loader, (list, tuple)) and loader[0] == CACHED_LOADER else [loader])
+        ]
+    return templates
+
+
+class Command(BaseCommand):
+    help = ('Render every tracker page as a given user with and without the cached template loader and '
+            'fragment caching, reporting render time per template as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='bench_1',
+                            help='User to browse as (see generate_synthetic_data)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view first')
+        parser.add_argument('--views', nargs='+', metavar='NAME',
+                            help='Only these views, e.g. tracker:dashboard tracker:analytics')
+        parser.add_argument('-o', '--output', help='Write the JSON report here (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist; run generate_synthetic_data first")
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+
+        urls = [url for name, url in tracker_urls(user) if not options['views'] or name in options['views']]
+        if not urls:
+            raise CommandError('None of --views match a tracker URL name')
+        configurations = {
+            'before': {
+                'TEMPLATES': uncached_templates(),
+                'CACHES': {**settings.CACHES,
+                           'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+            },
+            'after': {},
+        }
+        timings = {}
+        # The test client talks to 'testserver' over http.
+        with override_settings(ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS], SECURE_SSL_REDIRECT=False):
+            for label, overrides in configurations.items():
+                with override_settings(**overrides):
+                    client = Client()
+                    client.force_login(user)
+                    for url in urls:
+                        for _ in range(options['warmup']):
+                            client.get(url)
+                    with TemplateTimer() as timer:
+                        for url in urls:
+                            for _ in range(options['iterations']):
+                                client.get(url)
+                timings[label] = timer.timings
+
+        results = {}
+        for name in sorted(timings['after']):
+            before, after = latency(timings['before'][name]), latency(timings['after'][name])
+            results[name] = {
+                'before': before,
+                'after': after,
+                'p50_speedup': round(before['p50_ms'] / after['p50_ms'], 2) if after['p50_ms'] else None,
+            }
+            self.stderr.write(
+                f'{name:<36} before {before["p50_ms"]:>8.2f} ms p50  after {after["p50_ms"]:>8.2f} ms p50  '
+                f'({results[name]["p50_speedup"]}x)'
+            )
+
+        report = {
+            'meta': {
+                'generated_at': timezone.now().isoformat(),
+                'username': user.username,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'debug': settings.DEBUG,
+            },
+            'templates': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,35 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.exporters import EXPORT_FORMATS, iter_export
+from tracker.importers import IMPORT_FORMS
+
+
+class Command(BaseCommand):
+    help = "Stream a user's tracker data as a zip of CSVs, NDJSON or a single model's CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='zip')
+        parser.add_argument('--model', choices=sorted(IMPORT_FORMS),
+                            help='Export only this model (required for --format csv)')
+        parser.add_argument('-o', '--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+        if options['format'] == 'csv' and not options['model']:
+            raise CommandError('--format csv needs --model')
+
+        model_names = [options['model']] if options['model'] else list(IMPORT_FORMS)
+        chunks = iter_export(user, options['format'], model_names)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,43 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.synthetic import generate_user
+
+
+class Command(BaseCommand):
+    help = 'Create users with years of realistic daily tracker history, for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Number of users to create')
+        parser.add_argument('--years', type=float, default=1, help='Years of daily history per user')
+        parser.add_argument('--days', type=int, help='Days of history per user (overrides --years)')
+        parser.add_argument('--prefix', default='bench', help='Usernames are <prefix>_<n>')
+        parser.add_argument('--password', default='bench-pass-123', help='Password for every generated user')
+        parser.add_argument('--seed', type=int, help='Seed for reproducible data')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete existing users with these usernames first')
+
+    def handle(self, *args, **options):
+        days = options['days'] or round(options['years'] * 365)
+        if days < 1 or options['users'] < 1:
+            raise CommandError('Need at least one user and one day of history')
+
+        usernames = [f'{options["prefix"]}_{n}' for n in range(1, options['users'] + 1)]
+        existing = User.objects.filter(username__in=usernames)
+        if existing.exists():
+            if not options['replace']:
+                raise CommandError(
+                    f'{existing.count()} of these users already exist; pass --replace or a different --prefix'
+                )
+            existing.delete()
+
+        rng = random.Random(options['seed'])
+        for username in usernames:
+            start = time.perf_counter()
+            _, counts = generate_user(username, days, rng=rng, password=options['password'])
+            rows = ', '.join(f'{n} {name}' for name, n in counts.items())
+            self.stdout.write(f'{username}: {rows} in {time.perf_counter() - start:.1f}s')
+        self.stdout.write(self.style.SUCCESS(f'Generated {len(usernames)} users with {days} days of history'))
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importers import DEFAULT_BATCH_SIZE, IMPORT_FORMS, Importer, iter_records
+
+
+class Command(BaseCommand):
+    help = 'Import tracker history for a user from a CSV or JSON / JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('model', choices=sorted(IMPORT_FORMS))
+        parser.add_argument('path', help='CSV with a header row, a JSON array of objects, or JSON Lines')
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk insert and transaction')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'json')
+        importer = Importer(user, options['model'], batch_size=options['batch_size'])
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                result = importer.run(iter_records(stream, fmt))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        for line, errors in result.errors:
+            details = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items())
+            self.stderr.write(f'Row {line}: {details}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more invalid rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.imported} {options["model"]} entries ({result.error_count} rows skipped)'
+        ))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tracker import profiling
+
+
+class Command(BaseCommand):
+    help = 'Show per-view latency and query percentiles collected by the profiling middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=profiling.SORT_KEYS, default='wall_ms',
+                            help='Order views by this metric\'s p95, or by request count')
+        parser.add_argument('--limit', type=int, default=20, help='Show at most this many views')
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON')
+        parser.add_argument('--reset', action='store_true', help='Discard collected snapshots afterwards')
+
+    def handle(self, *args, **options):
+        report = dict(list(profiling.report(options['sort']).items())[:options['limit']])
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        elif not report:
+            self.stdout.write('No profiled requests yet. Is PROFILING=true set for the server?')
+        else:
+            self.write_table(report)
+        if options['reset']:
+            profiling.reset()
+
+    def write_table(self, report):
+        width = max(len(name) for name in report)
+        header = (f'{"view":<{width}}  {"reqs":>6}  {"wall p50":>9}  {"p95":>8}  {"p99":>8}  '
+                  f'{"sql p95":>8}  {"tmpl p95":>8}  {"queries p50/p95":>15}')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, stats in report.items():
+            queries = f'{stats["queries"]["p50"]:.0f}/{stats["queries"]["p95"]:.0f}'
+            self.stdout.write(
+                f'{name:<{width}}  {stats["requests"]:>6}  {stats["wall_ms"]["p50"]:>9.1f}  '
+                f'{stats["wall_ms"]["p95"]:>8.1f}  {stats["wall_ms"]["p99"]:>8.1f}  '
+                f'{stats["sql_ms"]["p95"]:>8.1f}  {stats["template_ms"]["p95"]:>8.1f}  {queries:>15}'
+            )
+        for name, stats in report.items():
+            for repeated in stats['n_plus_one']:
+                self.stdout.write(self.style.WARNING(
+                    f'Possible N+1 in {name}: repeated up to {repeated["max_repeats"]}x in '
+                    f'{repeated["requests"]} requests: {repeated["sql"][:200]}'
+                ))
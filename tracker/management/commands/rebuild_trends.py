@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.caching import bump_version
+from tracker.trends import METRICS, refresh_trends
+
+
+class Command(BaseCommand):
+    help = "Recompute rolling averages and trends from the daily summaries (backfill, or after bulk edits)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only these users (default: everyone with summaries)')
+        parser.add_argument('--metric', action='append', choices=list(METRICS), dest='metrics',
+                            help='Only this metric (repeatable; default: all)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(dailysummary__isnull=False).distinct()
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        written = 0
+        for user_id in users.values_list('pk', flat=True):
+            written += refresh_trends(user_id, metrics=options['metrics'])
+            bump_version(user_id)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} trend points'))
@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.caching import bump_version
+from tracker.goal_progress import refresh_goal_progress
+
+
+class Command(BaseCommand):
+    help = "Recompute current_value for active goals from tracked data (after bulk edits or restores)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only these users (default: everyone with goals)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(healthgoal__status='active').distinct()
+        if options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        updated = 0
+        for user_id in users.values_list('pk', flat=True):
+            changed = refresh_goal_progress(user_id)
+            if changed:
+                bump_version(user_id)
+            updated += changed
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} goals'))
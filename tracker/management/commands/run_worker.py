@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from tracker.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = ("Process queued recompute jobs (daily summaries, goal progress, trends) written while "
+            "BACKGROUND_JOBS is on. Runs until interrupted, or with --once until the queue is empty.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2,
+                            help='Worker threads, each with its own database connection')
+        parser.add_argument('--users', type=int, default=10, help='Users claimed per batch by each thread')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds an idle thread waits before checking the queue again')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        done = []
+
+        def work():
+            finished = 0
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    count = run_pending(options['users'])
+                    finished += count
+                    if not count:
+                        if options['once']:
+                            break
+                        stop.wait(options['poll_interval'])
+            finally:
+                connection.close()
+                done.append(finished)
+
+        with ThreadPoolExecutor(max_workers=options['threads'], thread_name_prefix='recompute') as pool:
+            futures = [pool.submit(work) for _ in range(options['threads'])]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                self.stderr.write('Stopping after the current batch...')
+                stop.set()
+        self.stdout.write(self.style.SUCCESS(f'Processed {sum(done)} jobs'))
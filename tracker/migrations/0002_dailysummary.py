@@ -0,0 +1,136 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def backfill_daily_summaries(apps, schema_editor):
+    DailySummary = apps.get_model("tracker", "DailySummary")
+    rows = {}
+
+    def merge(queryset, **aggregates):
+        for row in queryset.values("user_id", "date").annotate(**aggregates):
+            key = (row.pop("user_id"), row.pop("date"))
+            rows.setdefault(key, {}).update(
+                {name: value for name, value in row.items() if value is not None}
+            )
+
+    merge(
+        apps.get_model("tracker", "Exercise").objects.all(),
+        exercise_count=Count("id"),
+        exercise_minutes=Sum("duration"),
+        calories_burned=Sum("calories_burned"),
+    )
+    merge(
+        apps.get_model("tracker", "Nutrition").objects.all(),
+        meal_count=Count("id"),
+        calories_consumed=Sum("calories"),
+        protein=Sum("protein"),
+        carbs=Sum("carbs"),
+        fat=Sum("fat"),
+    )
+    merge(
+        apps.get_model("tracker", "WaterIntake").objects.all(),
+        water_amount=Sum("amount"),
+    )
+    for entry in apps.get_model("tracker", "WeightEntry").objects.values(
+        "user_id", "date", "weight"
+    ):
+        rows.setdefault((entry["user_id"], entry["date"]), {})["weight"] = entry[
+            "weight"
+        ]
+    for entry in apps.get_model("tracker", "Mood").objects.values(
+        "user_id", "date", "mood", "notes"
+    ):
+        rows.setdefault((entry["user_id"], entry["date"]), {}).update(
+            mood=entry["mood"], mood_notes=entry["notes"]
+        )
+
+    DailySummary.objects.bulk_create(
+        [
+            DailySummary(user_id=user_id, date=date, **fields)
+            for (user_id, date), fields in rows.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("tracker", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "weight",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=5, null=True
+                    ),
+                ),
+                (
+                    "mood",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        choices=[
+                            (1, "😢 Very Sad"),
+                            (2, "😞 Sad"),
+                            (3, "😐 Neutral"),
+                            (4, "🙂 Happy"),
+                            (5, "😄 Very Happy"),
+                        ],
+                        null=True,
+                    ),
+                ),
+                ("mood_notes", models.TextField(blank=True)),
+                ("exercise_count", models.PositiveIntegerField(default=0)),
+                ("exercise_minutes", models.PositiveIntegerField(default=0)),
+                ("calories_burned", models.PositiveIntegerField(default=0)),
+                ("meal_count", models.PositiveIntegerField(default=0)),
+                ("calories_consumed", models.PositiveIntegerField(default=0)),
+                (
+                    "protein",
+                    models.DecimalField(decimal_places=1, default=0, max_digits=7),
+                ),
+                (
+                    "carbs",
+                    models.DecimalField(decimal_places=1, default=0, max_digits=7),
+                ),
+                ("fat", models.DecimalField(decimal_places=1, default=0, max_digits=7)),
+                (
+                    "water_amount",
+                    models.PositiveIntegerField(default=0, help_text="Amount in ml"),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Daily summaries",
+                "ordering": ["-date"],
+                "unique_together": {("user", "date")},
+            },
+        ),
+        migrations.RunPython(backfill_daily_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0002_dailysummary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="exercise",
+            index=models.Index(fields=["user", "date"], name="exercise_user_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="healthgoal",
+            index=models.Index(
+                fields=["user", "status", "target_date"],
+                name="goal_user_status_target_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="healthgoal",
+            index=models.Index(
+                fields=["user", "status", "updated_at"],
+                name="goal_user_status_updated_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="healthmetric",
+            index=models.Index(fields=["user", "date"], name="metric_user_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="nutrition",
+            index=models.Index(fields=["user", "date"], name="nutrition_user_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="sleep",
+            index=models.Index(
+                fields=["user", "sleep_time"], name="sleep_user_sleep_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="waterintake",
+            index=models.Index(
+                fields=["user", "date", "time"], name="water_user_date_time_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+import django.db.models.deletion
+
+from tracker.trends import rolling
+
+# metric -> (DailySummary column, the days that count as logged), as in tracker.trends.METRICS
+METRICS = {
+    "weight": ("weight", Q(weight__isnull=False)),
+    "calories_in": ("calories_consumed", Q(meal_count__gt=0)),
+    "calories_out": ("calories_burned", Q(exercise_count__gt=0)),
+    "water": ("water_amount", Q(water_amount__gt=0)),
+}
+
+
+def backfill_trend_points(apps, schema_editor):
+    DailySummary = apps.get_model("tracker", "DailySummary")
+    TrendPoint = apps.get_model("tracker", "TrendPoint")
+    user_ids = DailySummary.objects.order_by().values_list("user_id", flat=True).distinct()
+    for user_id in user_ids:
+        for metric, (column, logged) in METRICS.items():
+            rows = (
+                DailySummary.objects.filter(logged, user_id=user_id)
+                .order_by("date")
+                .values_list("date", column)
+            )
+            TrendPoint.objects.bulk_create(
+                [
+                    TrendPoint(
+                        user_id=user_id,
+                        metric=metric,
+                        date=day,
+                        value=value,
+                        average_7=average_7,
+                        average_30=average_30,
+                        trend=trend,
+                        slope_30=slope,
+                    )
+                    for day, value, average_7, average_30, trend, slope in rolling(rows)
+                ],
+                batch_size=500,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("tracker", "0003_tracker_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendPoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("weight", "Weight (kg)"),
+                            ("calories_in", "Calories consumed"),
+                            ("calories_out", "Calories burned"),
+                            ("water", "Water (ml)"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("value", models.FloatField()),
+                (
+                    "average_7",
+                    models.FloatField(
+                        help_text="Mean of the logged days in the last 7 days"
+                    ),
+                ),
+                (
+                    "average_30",
+                    models.FloatField(
+                        help_text="Mean of the logged days in the last 30 days"
+                    ),
+                ),
+                (
+                    "trend",
+                    models.FloatField(
+                        help_text="Exponentially weighted moving average"
+                    ),
+                ),
+                (
+                    "slope_30",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Least-squares change per day over the last 30 days",
+                        null=True,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["metric", "-date"],
+                "unique_together": {("user", "metric", "date")},
+            },
+        ),
+        migrations.RunPython(backfill_trend_points, migrations.RunPython.noop),
+    ]
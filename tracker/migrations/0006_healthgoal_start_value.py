@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:57
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_start_values(apps, schema_editor):
+    HealthGoal = apps.get_model("tracker", "HealthGoal")
+    first_weigh_in = (
+        apps.get_model("tracker", "WeightEntry")
+        .objects.filter(
+            user_id=OuterRef("user_id"),
+            date__gte=OuterRef("start_date"),
+            date__lte=OuterRef("target_date"),
+        )
+        .order_by("date")
+        .values("weight")[:1]
+    )
+    HealthGoal.objects.filter(goal_type="weight").update(
+        start_value=Subquery(first_weigh_in)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0005_recomputejob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="healthgoal",
+            name="start_value",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_start_values, migrations.RunPython.noop),
+    ]
@@ -89,6 +89,9 @@ class Exercise(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'date'], name='exercise_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.name} on {self.date}"
@@ -116,6 +119,9 @@ class Nutrition(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'date'], name='nutrition_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.food_name} ({self.meal_type}) on {self.date}"
@@ -131,6 +137,9 @@ class Sleep(models.Model):
 
     class Meta:
         ordering = ['-sleep_time']
+        indexes = [
+            models.Index(fields=['user', 'sleep_time'], name='sleep_user_sleep_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.sleep_time.date()} to {self.wake_time.date()}"
@@ -153,6 +162,9 @@ class WaterIntake(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='water_user_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.amount}ml on {self.date}"
@@ -183,26 +195,22 @@ class HealthGoal(models.Model):
     start_date = models.DateField(default=timezone.now)
     target_date = models.DateField()
     current_value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Weight goals: the first weigh-in in the goal's window, which progress is measured from
+    start_value = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status', 'target_date'], name='goal_user_status_target_idx'),
+            models.Index(fields=['user', 'status', 'updated_at'], name='goal_user_status_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
-    @property
-    def progress_percentage(self):
-        if self.target_value and self.current_value:
-            return min(100, round((self.current_value / self.target_value) * 100, 1))
-        return 0
-
-    @property
-    def is_overdue(self):
-        return timezone.now().date() > self.target_date and self.status == 'active'
-
 
 class Mood(models.Model):
     MOOD_CHOICES = [
@@ -266,6 +274,104 @@ class HealthMetric(models.Model):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'date'], name='metric_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.metric_type}: {self.value} on {self.date}"
+
+
+class DailySummary(models.Model):
+    """Per-user, per-day rollup of the tracker models, kept current by signals"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField()
+    weight = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    mood = models.PositiveIntegerField(choices=Mood.MOOD_CHOICES, null=True, blank=True)
+    mood_notes = models.TextField(blank=True)
+    exercise_count = models.PositiveIntegerField(default=0)
+    exercise_minutes = models.PositiveIntegerField(default=0)
+    calories_burned = models.PositiveIntegerField(default=0)
+    meal_count = models.PositiveIntegerField(default=0)
+    calories_consumed = models.PositiveIntegerField(default=0)
+    protein = models.DecimalField(max_digits=7, decimal_places=1, default=0)
+    carbs = models.DecimalField(max_digits=7, decimal_places=1, default=0)
+    fat = models.DecimalField(max_digits=7, decimal_places=1, default=0)
+    water_amount = models.PositiveIntegerField(default=0, help_text="Amount in ml")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['user', 'date']
+        verbose_name_plural = 'Daily summaries'
+
+    def __str__(self):
+        return f"{self.user.username} - Summary for {self.date}"
+
+
+class TrendPoint(models.Model):
+    """Rolling statistics for one metric on one logged day, kept current by signals (see tracker/trends.py)"""
+    METRIC_CHOICES = [
+        ('weight', 'Weight (kg)'),
+        ('calories_in', 'Calories consumed'),
+        ('calories_out', 'Calories burned'),
+        ('water', 'Water (ml)'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    date = models.DateField()
+    value = models.FloatField()
+    average_7 = models.FloatField(help_text="Mean of the logged days in the last 7 days")
+    average_30 = models.FloatField(help_text="Mean of the logged days in the last 30 days")
+    trend = models.FloatField(help_text="Exponentially weighted moving average")
+    slope_30 = models.FloatField(null=True, blank=True, help_text="Least-squares change per day over the last 30 days")
+
+    class Meta:
+        ordering = ['metric', '-date']
+        unique_together = ['user', 'metric', 'date']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.metric} trend on {self.date}"
+
+    @property
+    def weekly_change(self):
+        return None if self.slope_30 is None else self.slope_30 * 7
+
+
+class RecomputeJob(models.Model):
+    """A day of one user's entries whose derived data is out of date; drained by ``run_worker``.
+
+    At most one pending job exists per (user, source, date), so a burst of writes
+    to the same day queues a single job.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    source = models.CharField(max_length=50, help_text="Model label of the entries that changed")
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    claim = models.CharField(max_length=32, blank=True, help_text="Token of the worker batch running it")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'source', 'date'], condition=models.Q(status='pending'),
+                name='recompute_job_pending_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='recompute_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.source} on {self.date} ({self.status})"
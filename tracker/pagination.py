@@ -0,0 +1,186 @@
+import base64
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+PAGE_SIZE = 20
+
+# Below this many rows an exact COUNT(*) is cheap enough.
+ESTIMATE_ABOVE = 10000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds DjangoJSONEncoder drops: a seek from a truncated value misses its row"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values, backwards=False):
+    payload = json.dumps([int(backwards), values], cls=CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        backwards, values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return bool(backwards), values
+
+
+class CursorPage(Sequence):
+    """Drop-in for ``django.core.paginator.Page`` in the history templates, minus page numbers"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.cursor_for(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return self.paginator.cursor_for(self.object_list[0], backwards=True)
+        return None
+
+
+class KeysetPaginator:
+    """Seek pagination over a queryset whose ``order_by()`` ends in a unique column.
+
+    Each page is ``WHERE (keys) past the cursor ORDER BY keys LIMIT n + 1``, so page
+    500 costs the same index range scan as page 1 and no ``COUNT(*)`` is needed.
+    ``count`` is whatever total the caller already has (the cached page stats); it
+    is shown as "about N" because it may trail an in-flight write.
+    """
+
+    def __init__(self, queryset, per_page=PAGE_SIZE, count=None):
+        self.ordering = list(queryset.query.order_by)
+        if not self.ordering or self.ordering[-1].lstrip('-') not in ('id', 'pk'):
+            raise ValueError('KeysetPaginator needs an ordering that ends with the primary key')
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count = count
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def cursor_for(self, obj, backwards=False):
+        return encode_cursor([getattr(obj, field.attname) for field in self.fields], backwards)
+
+    def _values(self, raw):
+        if len(raw) != len(self.fields):
+            raise InvalidCursor(raw)
+        try:
+            return [field.to_python(value) for field, value in zip(self.fields, raw)]
+        except Exception:
+            raise InvalidCursor(raw)
+
+    def _seek(self, values, backwards):
+        """Rows strictly after ``values`` in the page's direction"""
+        # Expanded row comparison (a < x) OR (a = x AND b < y) ... The extra bound on
+        # the leading column lets the planner turn it into an index range scan.
+        seek, equal = Q(), Q()
+        for field, value, descending in zip(self.fields, values, self.descending):
+            lookup = 'lt' if descending != backwards else 'gt'
+            seek |= equal & Q(**{f'{field.name}__{lookup}': value})
+            equal &= Q(**{field.name: value})
+        lead = 'lte' if self.descending[0] != backwards else 'gte'
+        return Q(**{f'{self.fields[0].name}__{lead}': values[0]}) & seek
+
+    def get_page(self, cursor=None):
+        backwards, values = False, None
+        if cursor:
+            try:
+                backwards, raw = decode_cursor(cursor)
+                values = self._values(raw)
+            except InvalidCursor:
+                backwards, values = False, None
+
+        queryset = self.queryset
+        if backwards:
+            queryset = queryset.reverse()
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        del rows[self.per_page:]
+
+        if not backwards:
+            return CursorPage(rows, self, has_next=more, has_previous=values is not None)
+        if not more:
+            # Walked back to the newest rows; serve a full first page rather than a short one.
+            return self.get_page()
+        rows.reverse()
+        return CursorPage(rows, self, has_next=True, has_previous=True)
+
+
+def estimated_count(queryset):
+    """The planner's row estimate for ``queryset``'s table, or None where the backend has nothing cheap.
+
+    PostgreSQL keeps ``reltuples`` from the last ANALYZE; on SQLite the largest
+    rowid is one index seek and overcounts only by rows since deleted.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0) for a table that was never analyzed.
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists of large tables.
+
+    An unfiltered list takes its count from ``estimated_count()`` instead of
+    scanning the table; filtered lists and small tables still count exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset)
+            if estimate is not None and estimate > ESTIMATE_ABOVE:
+                return estimate
+        return super().count
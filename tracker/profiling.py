@@ -0,0 +1,352 @@
+"""Opt-in request profiling: per-view query counts, SQL, template and wall time.
+
+Enabled with ``PROFILING=true`` (see settings), which adds the middleware and has
+the app's ``ready()`` call ``install()``. Each process keeps log-bucketed
+histograms in memory and snapshots them to ``PROFILING_DIR`` so the
+``profiling_report`` command and the staff endpoint can merge every worker.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 95, 99)
+FLUSH_INTERVAL = 10  # seconds between snapshots to PROFILING_DIR
+MAX_SHAPES = 20  # repeated-SQL examples kept per view
+
+_current = ContextVar('tracker_profile', default=None)
+
+# Collapse the bits of a statement that vary between otherwise identical queries.
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def sql_shape(sql):
+    return _LITERALS.sub('?', _IN_LIST.sub('(%s, ...)', sql))
+
+
+class Histogram:
+    """Log-bucketed histogram; percentiles are within ``growth`` of the true value.
+
+    Constant memory however many samples it sees, and two histograms merge by
+    adding their bucket counts, which is how per-process snapshots are combined.
+    Values at or below zero share one bucket.
+    """
+
+    def __init__(self, growth=1.05):
+        self.growth = growth
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, value):
+        return math.floor(math.log(value, self.growth)) if value > 0 else None
+
+    def add(self, value):
+        self.buckets[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+        for bucket in sorted(self.buckets, key=lambda b: -math.inf if b is None else b):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return 0 if bucket is None else min(self.max, self.growth ** (bucket + 1))
+        return self.max
+
+    def summary(self):
+        stats = {f'p{q}': round(self.percentile(q), 2) for q in PERCENTILES}
+        stats.update(mean=round(self.total / self.count, 2) if self.count else 0, max=round(self.max, 2))
+        return stats
+
+    def to_dict(self):
+        return {
+            'buckets': [[bucket, n] for bucket, n in self.buckets.items()],
+            'count': self.count, 'total': self.total, 'max': self.max,
+        }
+
+    def merge(self, data):
+        for bucket, n in data['buckets']:
+            self.buckets[bucket] += n
+        self.count += data['count']
+        self.total += data['total']
+        self.max = max(self.max, data['max'])
+
+
+class ViewStats:
+    METRICS = ('wall_ms', 'sql_ms', 'template_ms', 'queries')
+
+    def __init__(self):
+        self.histograms = {metric: Histogram() for metric in self.METRICS}
+        # SQL shape -> [requests where it repeated past the threshold, most repeats in one request]
+        self.repeated_sql = {}
+
+    def add(self, sample, repeated):
+        for metric in self.METRICS:
+            self.histograms[metric].add(sample[metric])
+        for shape, times in repeated.items():
+            if shape in self.repeated_sql:
+                entry = self.repeated_sql[shape]
+                entry[0] += 1
+                entry[1] = max(entry[1], times)
+            elif len(self.repeated_sql) < MAX_SHAPES:
+                self.repeated_sql[shape] = [1, times]
+
+    def to_dict(self):
+        return {
+            'histograms': {metric: h.to_dict() for metric, h in self.histograms.items()},
+            'repeated_sql': self.repeated_sql,
+        }
+
+    def merge(self, data):
+        for metric, histogram in data['histograms'].items():
+            self.histograms[metric].merge(histogram)
+        for shape, (requests, times) in data['repeated_sql'].items():
+            entry = self.repeated_sql.setdefault(shape, [0, 0])
+            entry[0] += requests
+            entry[1] = max(entry[1], times)
+
+    def report(self):
+        return {
+            'requests': self.histograms['wall_ms'].count,
+            **{metric: h.summary() for metric, h in self.histograms.items()},
+            'n_plus_one': [
+                {'sql': shape, 'requests': requests, 'max_repeats': times}
+                for shape, (requests, times) in sorted(self.repeated_sql.items(), key=lambda item: -item[1][0])
+            ],
+        }
+
+
+SORT_KEYS = ViewStats.METRICS + ('requests',)
+
+
+class ProfileStore:
+    """This process's per-view stats, snapshotted to ``PROFILING_DIR`` every few seconds"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+        self.last_flush = time.monotonic()
+
+    def record(self, view_name, sample, repeated):
+        with self.lock:
+            self.views[view_name].add(sample, repeated)
+            due = time.monotonic() - self.last_flush >= FLUSH_INTERVAL
+            if due:
+                self.last_flush = time.monotonic()
+                snapshot = self.to_dict()
+        if due:
+            self.flush(snapshot)
+
+    def to_dict(self):
+        return {name: stats.to_dict() for name, stats in self.views.items()}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def flush(self, snapshot=None):
+        directory = profiling_dir()
+        if directory is None:
+            return
+        if snapshot is None:
+            with self.lock:
+                snapshot = self.to_dict()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f'profile-{os.getpid()}.json'
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(snapshot))
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning('Could not write profiling snapshot to %s', directory, exc_info=True)
+
+
+store = ProfileStore()
+
+
+def profiling_dir():
+    directory = getattr(settings, 'PROFILING_DIR', None)
+    return Path(directory) if directory else None
+
+
+def collect(include_files=True):
+    """Merge this process's live stats with every other process's latest snapshot"""
+    views = defaultdict(ViewStats)
+    snapshots = []
+    directory = profiling_dir()
+    if include_files and directory and directory.is_dir():
+        own = f'profile-{os.getpid()}.json'
+        for path in directory.glob('profile-*.json'):
+            if path.name == own:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+    with store.lock:
+        snapshots.append(store.to_dict())
+    for snapshot in snapshots:
+        for name, data in snapshot.items():
+            views[name].merge(data)
+    return views
+
+
+def report(sort='wall_ms', include_files=True):
+    views = {name: stats.report() for name, stats in collect(include_files).items()}
+    key = (lambda item: -item[1]['requests']) if sort == 'requests' else (lambda item: -item[1][sort]['p95'])
+    return dict(sorted(views.items(), key=key))
+
+
+def reset():
+    store.reset()
+    directory = profiling_dir()
+    if directory and directory.is_dir():
+        for path in directory.glob('profile-*.json'):
+            path.unlink(missing_ok=True)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+        # An async view's fan-out queries report from several threads at once.
+        self.lock = threading.Lock()
+
+    def add_query(self, sql, duration):
+        with self.lock:
+            self.sql_time += duration
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+
+def _profiled_execute(execute, sql, params, many, context):
+    # Execute wrapper on every connection; the request's profile travels in a
+    # ContextVar, which sync_to_async copies into whichever thread runs the query.
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - start)
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    if _profiled_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profiled_execute)
+
+
+_original_render = DjangoTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context, request)
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        profile.template_time += time.perf_counter() - start
+
+
+def install():
+    """Hook template renders and every database connection; both are no-ops outside a profiled request"""
+    DjangoTemplate.render = _timed_render
+    connection_created.connect(_wrap_connection, dispatch_uid='tracker.profiling')
+    # Connections this thread opened before the hook existed
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(None, connection)
+
+
+def uninstall():
+    DjangoTemplate.render = _original_render
+    connection_created.disconnect(dispatch_uid='tracker.profiling')
+    for connection in connections.all(initialized_only=True):
+        if _profiled_execute in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_profiled_execute)
+
+
+class ProfilingMiddleware:
+    """Record per-view timings for every routed request; add it first in MIDDLEWARE.
+
+    Needs ``install()`` (done at startup when ``PROFILING`` is on). Template time
+    covers top-level renders through the Django template backend (``render()``,
+    ``render_to_string``); includes and extends count towards them. The
+    middleware runs natively under ASGI, so async views keep their event loop,
+    and queries they hand to worker threads (``gather_queries()``) are counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'PROFILING_N_PLUS_ONE', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, profile, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, profile, time.perf_counter() - start)
+        return response
+
+    def record(self, request, profile, wall_time):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return  # static files and unrouted 404s
+        repeated = {shape: n for shape, n in profile.shapes.items() if n >= self.threshold}
+        if repeated:
+            logger.warning(
+                'Possible N+1 in %s: %s',
+                match.view_name, '; '.join(f'{n}x {shape[:120]}' for shape, n in repeated.items()),
+            )
+        store.record(match.view_name, {
+            'wall_ms': wall_time * 1000,
+            'sql_ms': profile.sql_time * 1000,
+            'template_ms': profile.template_time * 1000,
+            'queries': profile.queries,
+        }, repeated)
@@ -0,0 +1,102 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import jobs
+from .caching import VERSIONED_MODELS, bump_version
+from .goal_progress import GOAL_SOURCES, entry_day, refresh_goal_progress
+from .models import HealthGoal
+from .summaries import SUMMARY_SOURCES, as_date, refresh_daily_summary
+from .trends import TREND_SOURCES, refresh_trends
+
+
+def _is_own_delete(sender, origin):
+    # Skip rows removed by a cascade from User; the summaries go with it.
+    return getattr(origin, 'model', type(origin)) is sender
+
+
+@receiver(pre_save)
+def remember_previous_date(sender, instance, **kwargs):
+    if sender not in SUMMARY_SOURCES or instance._state.adding:
+        return
+    instance._summary_previous_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save)
+def update_summary_on_save(sender, instance, **kwargs):
+    if sender not in SUMMARY_SOURCES or jobs.enabled():
+        return
+    date = as_date(sender, instance.date)
+    refresh_daily_summary(instance.user_id, date, [sender])
+    previous_date = getattr(instance, '_summary_previous_date', None)
+    if previous_date and previous_date != date:
+        refresh_daily_summary(instance.user_id, previous_date, [sender])
+
+
+@receiver(post_delete)
+def update_summary_on_delete(sender, instance, origin=None, **kwargs):
+    if sender not in SUMMARY_SOURCES or not _is_own_delete(sender, origin) or jobs.enabled():
+        return
+    refresh_daily_summary(instance.user_id, as_date(sender, instance.date), [sender])
+
+
+# Registered after the summary receivers: nutrition and water goals read DailySummary.
+@receiver(post_save)
+def update_goals_on_save(sender, instance, created=False, **kwargs):
+    if sender in GOAL_SOURCES and not jobs.enabled():
+        # An edit may move an entry out of a goal's window, so only new entries narrow by day.
+        day = entry_day(sender, instance) if created else None
+        refresh_goal_progress(instance.user_id, [GOAL_SOURCES[sender]], day)
+    elif sender is HealthGoal:
+        refresh_goal_progress(instance.user_id, goals=HealthGoal.objects.filter(pk=instance.pk, status='active'))
+
+
+@receiver(post_delete)
+def update_goals_on_delete(sender, instance, origin=None, **kwargs):
+    if sender not in GOAL_SOURCES or not _is_own_delete(sender, origin) or jobs.enabled():
+        return
+    refresh_goal_progress(instance.user_id, [GOAL_SOURCES[sender]], entry_day(sender, instance))
+
+
+# Also reads DailySummary, so it too runs after the summary receivers.
+@receiver(post_save)
+def update_trends_on_save(sender, instance, **kwargs):
+    if sender not in TREND_SOURCES or jobs.enabled():
+        return
+    since = as_date(sender, instance.date)
+    previous_date = getattr(instance, '_summary_previous_date', None)
+    if previous_date:
+        since = min(since, previous_date)
+    refresh_trends(instance.user_id, since, [TREND_SOURCES[sender]])
+
+
+@receiver(post_delete)
+def update_trends_on_delete(sender, instance, origin=None, **kwargs):
+    if sender not in TREND_SOURCES or not _is_own_delete(sender, origin) or jobs.enabled():
+        return
+    refresh_trends(instance.user_id, as_date(sender, instance.date), [TREND_SOURCES[sender]])
+
+
+# With BACKGROUND_JOBS the receivers above stand down and the worker does their work.
+@receiver(post_save)
+def queue_recompute_on_save(sender, instance, **kwargs):
+    if sender not in jobs.QUEUED_SOURCES or not jobs.enabled():
+        return
+    dates = {entry_day(sender, instance)}
+    previous_date = getattr(instance, '_summary_previous_date', None)
+    if previous_date:
+        dates.add(previous_date)
+    jobs.enqueue(instance.user_id, sender, dates)
+
+
+@receiver(post_delete)
+def queue_recompute_on_delete(sender, instance, origin=None, **kwargs):
+    if sender not in jobs.QUEUED_SOURCES or not _is_own_delete(sender, origin) or not jobs.enabled():
+        return
+    jobs.enqueue(instance.user_id, sender, [entry_day(sender, instance)])
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_cached_views(sender, instance, **kwargs):
+    if sender in VERSIONED_MODELS:
+        bump_version(instance.user_id)
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+from django.db.models import (
+    Avg, Case, Count, DurationField, ExpressionWrapper, F, FloatField, IntegerField, Max, Q, Subquery, Sum, Value,
+    When,
+)
+from django.db.models.functions import Cast, ExtractYear, NullIf, Round
+
+from .models import Exercise, Mood, Nutrition, Sleep, WaterIntake, WeightEntry
+
+
+# Evaluated by the database (interval on PostgreSQL, microseconds on SQLite), so
+# sleep averages never have to load rows to call Sleep.duration_hours.
+SLEEP_DURATION = ExpressionWrapper(F('wake_time') - F('sleep_time'), output_field=DurationField())
+
+# Adults are recommended 7-9 hours a night.
+SHORT_SLEEP = timedelta(hours=7)
+LONG_SLEEP = timedelta(hours=9)
+
+
+def page_stats(queryset, **aggregates):
+    """Evaluate every aggregate a tracker page needs over ``queryset`` in one query.
+
+    All-time and single-day figures are mixed with conditional aggregates such as
+    ``Sum('calories', filter=Q(date=today))``. Aggregates over no rows read as 0.
+    """
+    stats = queryset.order_by().aggregate(**aggregates)
+    return {name: 0 if value is None else value for name, value in stats.items()}
+
+
+def weight_stats(user):
+    entries = WeightEntry.objects.filter(user=user)
+    dates = entries.order_by().values('date')
+    stats = page_stats(
+        entries,
+        count=Count('id'),
+        avg_weight=Avg('weight'),
+        # Entries are unique per (user, date), so the weight on the min/max date is the first/latest one.
+        first_weight=Max('weight', filter=Q(date=Subquery(dates.order_by('date')[:1]))),
+        latest_weight=Max('weight', filter=Q(date=Subquery(dates.order_by('-date')[:1]))),
+    )
+    if stats['count']:
+        stats['weight_change'] = stats['latest_weight'] - stats['first_weight']
+    else:
+        stats['first_weight'] = stats['latest_weight'] = stats['weight_change'] = stats['avg_weight'] = None
+    return stats
+
+
+def exercise_stats(user):
+    return page_stats(
+        Exercise.objects.filter(user=user),
+        count=Count('id'),
+        total_calories=Sum('calories_burned'),
+        total_duration=Sum('duration'),
+    )
+
+
+def nutrition_stats(user, day):
+    today = Q(date=day)
+    return page_stats(
+        Nutrition.objects.filter(user=user),
+        count=Count('id'),
+        today_calories=Sum('calories', filter=today),
+        today_protein=Sum('protein', filter=today),
+        today_carbs=Sum('carbs', filter=today),
+        today_fat=Sum('fat', filter=today),
+    )
+
+
+def hours(duration):
+    return round(duration.total_seconds() / 3600, 1) if duration else 0
+
+
+def sleep_stats(user):
+    stats = page_stats(
+        Sleep.objects.filter(user=user).annotate(duration=SLEEP_DURATION),
+        count=Count('id'),
+        avg_sleep_quality=Avg('quality'),
+        avg_duration=Avg('duration'),
+        total_duration=Sum('duration'),
+        short_nights=Count('id', filter=Q(duration__lt=SHORT_SLEEP)),
+        recommended_nights=Count('id', filter=Q(duration__gte=SHORT_SLEEP, duration__lte=LONG_SLEEP)),
+        long_nights=Count('id', filter=Q(duration__gt=LONG_SLEEP)),
+    )
+    stats['avg_sleep_duration'] = hours(stats.pop('avg_duration'))
+    stats['total_sleep_hours'] = hours(stats.pop('total_duration'))
+    return stats
+
+
+def water_stats(user, day):
+    return page_stats(
+        WaterIntake.objects.filter(user=user),
+        count=Count('id'),
+        today_water=Sum('amount', filter=Q(date=day)),
+    )
+
+
+def mood_stats(user):
+    return page_stats(
+        Mood.objects.filter(user=user),
+        count=Count('id'),
+        avg_mood=Avg('mood'),
+    )
+
+
+# Admin changelist columns and filters, computed by the database
+
+def bmi_expression(weight, height):
+    """UserProfile.get_bmi() in SQL, from weight (kg) and height (cm) field paths; NULL without a height"""
+    height_m = NullIf(Cast(height, FloatField()), Value(0.0)) / 100
+    return Round(Cast(weight, FloatField()) / (height_m * height_m), 2)
+
+
+def age_expression(birth_date, today):
+    """UserProfile.get_age() in SQL: whole years from a date field path to ``today``; NULL without one"""
+    birthday_to_come = (
+        Q(**{f'{birth_date}__month__gt': today.month})
+        | Q(**{f'{birth_date}__month': today.month, f'{birth_date}__day__gt': today.day})
+    )
+    return ExpressionWrapper(
+        Value(today.year) - ExtractYear(birth_date)
+        - Case(When(birthday_to_come, then=Value(1)), default=Value(0)),
+        output_field=IntegerField(),
+    )
+
+
+# WHO body-mass index bands: key, label, lower bound (inclusive), upper bound
+BMI_CATEGORIES = [
+    ('underweight', 'Underweight (< 18.5)', None, 18.5),
+    ('normal', 'Normal (18.5 - 25)', 18.5, 25),
+    ('overweight', 'Overweight (25 - 30)', 25, 30),
+    ('obese', 'Obese (30+)', 30, None),
+]
+
+
+def bmi_category(value):
+    for key, _, lower, upper in BMI_CATEGORIES:
+        if (lower is None or value >= lower) and (upper is None or value < upper):
+            return key
@@ -0,0 +1,87 @@
+from django.db.models import Count, Max, Sum
+
+from .models import DailySummary, Exercise, Mood, Nutrition, WaterIntake, WeightEntry
+
+# Each source model only rolls up into its own columns, so a write to one
+# model re-aggregates that model's rows for a single day and nothing else.
+# WeightEntry and Mood are unique per (user, date), so Max() just picks the row.
+SUMMARY_SOURCES = {
+    WeightEntry: {
+        'weight': Max('weight'),
+    },
+    Mood: {
+        'mood': Max('mood'),
+        'mood_notes': Max('notes'),
+    },
+    Exercise: {
+        'exercise_count': Count('id'),
+        'exercise_minutes': Sum('duration'),
+        'calories_burned': Sum('calories_burned'),
+    },
+    Nutrition: {
+        'meal_count': Count('id'),
+        'calories_consumed': Sum('calories'),
+        'protein': Sum('protein'),
+        'carbs': Sum('carbs'),
+        'fat': Sum('fat'),
+    },
+    WaterIntake: {
+        'water_amount': Sum('amount'),
+    },
+}
+
+SUMMARY_FIELDS = [name for aggregates in SUMMARY_SOURCES.values() for name in aggregates]
+
+
+def as_date(model, value):
+    """Normalize a model's ``date`` value, which may still be the datetime from ``default=timezone.now``"""
+    return model._meta.get_field('date').to_python(value)
+
+
+def _empty(name):
+    return DailySummary._meta.get_field(name).get_default()
+
+
+def _fields(model, totals):
+    return {name: _empty(name) if totals.get(name) is None else totals[name] for name in SUMMARY_SOURCES[model]}
+
+
+def refresh_daily_summary(user_id, date, models=None):
+    """Recompute the summary columns fed by ``models`` (default: all sources) for one day"""
+    fields = {}
+    for model in models or SUMMARY_SOURCES:
+        totals = model.objects.filter(user_id=user_id, date=date).aggregate(**SUMMARY_SOURCES[model])
+        fields.update(_fields(model, totals))
+    summary, _ = DailySummary.objects.update_or_create(user_id=user_id, date=date, defaults=fields)
+    return summary
+
+
+def rebuild_daily_summaries(user_id, dates=None):
+    """Recompute a user's summaries (all days, or only ``dates``) with one grouped query per source.
+
+    Used after writes that bypass signals, such as ``bulk_create`` in the importer.
+    """
+    if dates is not None and not dates:
+        return
+    rows = {}
+    for model, aggregates in SUMMARY_SOURCES.items():
+        entries = model.objects.filter(user_id=user_id)
+        if dates is not None:
+            entries = entries.filter(date__range=[min(dates), max(dates)])
+        for totals in entries.order_by().values('date').annotate(**aggregates):
+            if dates is None or totals['date'] in dates:
+                rows.setdefault(totals['date'], {}).update(_fields(model, totals))
+
+    if dates is None:
+        DailySummary.objects.filter(user_id=user_id).exclude(date__in=rows).delete()
+    else:
+        DailySummary.objects.filter(user_id=user_id, date__in=set(dates) - rows.keys()).delete()
+
+    empty = {name: _empty(name) for name in SUMMARY_FIELDS}
+    DailySummary.objects.bulk_create(
+        [DailySummary(user_id=user_id, date=date, **{**empty, **fields}) for date, fields in rows.items()],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=SUMMARY_FIELDS + ['updated_at'],
+    )
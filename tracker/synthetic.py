@@ -0,0 +1,123 @@
+import math
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_version
+from .goal_progress import refresh_goal_progress
+from .models import Exercise, HealthGoal, Mood, Nutrition, Sleep, UserProfile, WaterIntake, WeightEntry
+from .summaries import rebuild_daily_summaries
+from .trends import refresh_trends
+
+BATCH_SIZE = 2000
+
+MEALS = {
+    'breakfast': [('Oatmeal', 350), ('Eggs and toast', 420), ('Yogurt with fruit', 280)],
+    'lunch': [('Chicken salad', 520), ('Turkey sandwich', 610), ('Lentil soup', 450)],
+    'dinner': [('Salmon with rice', 720), ('Pasta', 800), ('Stir fry', 650)],
+    'snack': [('Apple', 95), ('Protein bar', 210), ('Nuts', 180)],
+}
+WORKOUTS = [
+    ('cardio', 'Running', 8), ('cardio', 'Cycling', 7), ('strength', 'Weights', 5),
+    ('flexibility', 'Yoga', 3), ('sports', 'Tennis', 7),
+]
+
+
+def synthetic_history(user, days, end_date, rng):
+    """Yield ``(model, [unsaved rows])`` for ``days`` of daily history ending on ``end_date``.
+
+    Weight drifts with a weekly wobble, most days have three or four meals, about
+    half have a workout, and every night has a sleep entry and several glasses of water.
+    """
+    tz = timezone.get_current_timezone()
+    weight = rng.uniform(65, 95)
+    for offset in range(days):
+        day = end_date - timedelta(days=days - 1 - offset)
+        weight += rng.gauss(-0.01, 0.15)
+        yield WeightEntry, [WeightEntry(
+            user=user, date=day, weight=round(weight + 0.4 * math.sin(offset / 7 * 2 * math.pi), 2),
+        )]
+
+        meals = ['breakfast', 'lunch', 'dinner'] + (['snack'] if rng.random() < 0.6 else [])
+        yield Nutrition, [
+            Nutrition(
+                user=user, date=day, meal_type=meal, food_name=food,
+                calories=int(calories * rng.uniform(0.8, 1.2)),
+                protein=round(calories * rng.uniform(0.03, 0.08), 1),
+                carbs=round(calories * rng.uniform(0.08, 0.15), 1),
+                fat=round(calories * rng.uniform(0.02, 0.05), 1),
+            )
+            for meal in meals
+            for food, calories in [rng.choice(MEALS[meal])]
+        ]
+
+        workouts = []
+        for _ in range(rng.choice([0, 0, 1, 1, 1, 2])):
+            exercise_type, name, per_minute = rng.choice(WORKOUTS)
+            duration = rng.randint(20, 90)
+            workouts.append(Exercise(
+                user=user, date=day, exercise_type=exercise_type, name=name, duration=duration,
+                calories_burned=duration * per_minute,
+            ))
+        yield Exercise, workouts
+
+        bedtime = datetime.combine(day, time(22), tzinfo=tz) + timedelta(minutes=rng.randint(-60, 120))
+        yield Sleep, [Sleep(
+            user=user, sleep_time=bedtime, wake_time=bedtime + timedelta(minutes=rng.randint(330, 570)),
+            quality=rng.randint(4, 10),
+        )]
+
+        yield WaterIntake, [
+            WaterIntake(user=user, date=day, time=time(hour), amount=rng.choice([250, 330, 500]))
+            for hour in sorted(rng.sample(range(7, 22), rng.randint(4, 8)))
+        ]
+
+        if rng.random() < 0.7:
+            yield Mood, [Mood(user=user, date=day, mood=rng.randint(2, 5))]
+
+
+def generate_user(username, days, end_date=None, rng=None, password=None):
+    """Create ``username`` with ``days`` of synthetic history; returns the user and row counts per model"""
+    rng = rng or random.Random()
+    end_date = end_date or timezone.now().date()
+    pending = {}
+    counts = {}
+
+    def flush(model):
+        model.objects.bulk_create(pending.pop(model), batch_size=BATCH_SIZE)
+
+    with transaction.atomic():
+        user = User.objects.create_user(username, password=password)
+        UserProfile.objects.create(
+            user=user, gender=rng.choice(['M', 'F']), height=rng.randint(155, 195),
+            date_of_birth=end_date - timedelta(days=365 * rng.randint(20, 60)),
+        )
+        for model, rows in synthetic_history(user, days, end_date, rng):
+            pending.setdefault(model, []).extend(rows)
+            counts[model.__name__] = counts.get(model.__name__, 0) + len(rows)
+            if len(pending[model]) >= BATCH_SIZE:
+                flush(model)
+        for model in list(pending):
+            flush(model)
+
+        start_date = end_date - timedelta(days=min(days, 90))
+        HealthGoal.objects.bulk_create([
+            HealthGoal(user=user, goal_type=goal_type, title=title, description=title, target_value=target,
+                       target_unit=unit, start_date=start_date, target_date=end_date + timedelta(days=60))
+            for goal_type, title, target, unit in [
+                ('weight', 'Reach target weight', 70, 'kg'),
+                ('exercise', 'Exercise 3000 minutes', 3000, 'minutes'),
+                ('sleep', 'Sleep 8 hours', 8, 'hours'),
+                ('water', 'Drink 2.5 liters a day', 2500, 'ml'),
+            ]
+        ])
+
+        # bulk_create skips the signals that keep these current.
+        rebuild_daily_summaries(user.pk)
+        refresh_goal_progress(user.pk)
+        refresh_trends(user.pk)
+    bump_version(user.pk)
+    return user, counts
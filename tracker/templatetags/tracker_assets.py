@@ -0,0 +1,39 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from tracker.assets import BUNDLES, CSS_COOKIE, bundles_collected, critical_css
+
+register = template.Library()
+
+PRELOAD_STYLESHEET = (
+    '<style>{}</style>\n'
+    '<link href="{}" rel="preload" as="style" onload="this.onload=null;this.rel=\'stylesheet\';'
+    'document.cookie=\'{}={};path=/;max-age=31536000;samesite=lax\'">\n'
+    '<noscript><link href="{}" rel="stylesheet"></noscript>'
+)
+
+
+@register.simple_tag(takes_context=True)
+def asset_bundle(context, name):
+    """``<link>``/``<script defer>`` for a bundle, or for each of its members until it has been collected.
+
+    A stylesheet bundle the browser has not cached yet is preloaded behind the page's critical CSS.
+    """
+    if not bundles_collected():
+        urls = [static(member) for member in BUNDLES[name]]
+    elif name.endswith('.css'):
+        url = static(name)
+        filename = url.rsplit('/', 1)[-1]
+        request = context.get('request')
+        css = critical_css(getattr(context.template, 'name', None))
+        if css and request is not None and request.COOKIES.get(CSS_COOKIE) != filename:
+            return format_html(PRELOAD_STYLESHEET, mark_safe(css.replace('</', '<\\/')), url, CSS_COOKIE, filename,
+                               url)
+        urls = [url]
+    else:
+        urls = [static(name)]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link href="{}" rel="stylesheet">', ((url,) for url in urls))
+    return format_html_join('\n', '<script src="{}" defer></script>', ((url,) for url in urls))
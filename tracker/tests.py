@@ -1,3 +1,1270 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import zipfile
+from unittest import mock, skipUnless
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import assets, charts, correlations, critical_css, jobs, profiling
+from .async_views import gather_queries
+from .batch import log_entries
+from .charts import MAX_POINTS, largest_triangle_three_buckets
+from .goal_progress import evaluate_goals, with_progress
+from .importers import Importer, iter_csv_records, iter_json_records
+from .models import (
+    DailySummary, Exercise, HealthGoal, Mood, Nutrition, RecomputeJob, Sleep, TrendPoint, UserProfile, WaterIntake,
+    WeightEntry,
+)
+from .synthetic import generate_user
+from .trends import METRICS, refresh_trends, rolling
+
+# Templates are rendered without running collectstatic first.
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class TrackerTestCase(TestCase):
+    def setUp(self):
+        # User ids are reused between tests, so cached per-user contexts must not survive them.
+        cache.clear()
+
+
+class DailySummaryTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+
+    def summary(self, date=None):
+        return DailySummary.objects.get(user=self.user, date=date or self.today)
+
+    def test_writes_roll_up_into_daily_summary(self):
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=30, calories_burned=300)
+        Exercise.objects.create(user=self.user, exercise_type='strength', name='Lift', duration=45, calories_burned=200)
+        Nutrition.objects.create(user=self.user, meal_type='lunch', food_name='Salad', calories=400, protein=20)
+        WaterIntake.objects.create(user=self.user, amount=500)
+        WeightEntry.objects.create(user=self.user, weight=70)
+        Mood.objects.create(user=self.user, mood=4, notes='Good day')
+
+        summary = self.summary()
+        self.assertEqual(summary.exercise_count, 2)
+        self.assertEqual(summary.exercise_minutes, 75)
+        self.assertEqual(summary.calories_burned, 500)
+        self.assertEqual(summary.calories_consumed, 400)
+        self.assertEqual(summary.protein, 20)
+        self.assertEqual(summary.water_amount, 500)
+        self.assertEqual(summary.weight, 70)
+        self.assertEqual((summary.mood, summary.mood_notes), (4, 'Good day'))
+
+    def test_edit_and_delete_keep_summary_current(self):
+        yesterday = self.today - timedelta(days=1)
+        water = WaterIntake.objects.create(user=self.user, amount=500)
+        water.date = yesterday
+        water.save()
+        self.assertEqual(self.summary().water_amount, 0)
+        self.assertEqual(self.summary(yesterday).water_amount, 500)
+
+        water.delete()
+        self.assertEqual(self.summary(yesterday).water_amount, 0)
+
+    def test_deleting_user_removes_summaries(self):
+        WeightEntry.objects.create(user=self.user, weight=70)
+        self.user.delete()
+        self.assertFalse(DailySummary.objects.exists())
+
+    def test_dashboard_query_count_does_not_grow_with_history(self):
+        self.client.force_login(self.user)
+        url = reverse('tracker:dashboard')
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(url)
+        for days_ago in range(30):
+            date = self.today - timedelta(days=days_ago)
+            WeightEntry.objects.create(user=self.user, weight=70, date=date)
+            Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run',
+                                    duration=30, calories_burned=300, date=date)
+        with self.assertNumQueries(len(baseline)):
+            response = self.client.get(url)
+        self.assertEqual(response.context['summary'].calories_burned, 300)
+
+
+class QueryPlanTests(TrackerTestCase):
+    """EXPLAIN every tracker-table query the views issue and reject full scans and sorts"""
+
+    VIEWS = [
+        'dashboard', 'weight_tracker', 'exercise_tracker', 'nutrition_tracker', 'sleep_tracker',
+        'water_tracker', 'goals', 'mood_tracker', 'profile', 'analytics', 'chart_data', 'correlations',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        now = timezone.now()
+        for days_ago in range(3):
+            date = now.date() - timedelta(days=days_ago)
+            WeightEntry.objects.create(user=self.user, weight=70, date=date)
+            Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run',
+                                    duration=30, calories_burned=300, date=date)
+            Nutrition.objects.create(user=self.user, meal_type='lunch', food_name='Salad', calories=400, date=date)
+            WaterIntake.objects.create(user=self.user, amount=250, date=date)
+            Mood.objects.create(user=self.user, mood=3, date=date)
+            Sleep.objects.create(user=self.user, quality=7, sleep_time=now - timedelta(days=days_ago, hours=8),
+                                 wake_time=now - timedelta(days=days_ago))
+        for status in ('active', 'completed', 'paused'):
+            HealthGoal.objects.create(user=self.user, goal_type='weight', title='Goal', description='',
+                                      status=status, target_date=now.date() + timedelta(days=30))
+        self.client.force_login(self.user)
+
+    def explain(self, cursor, sql):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make a sequential scan look cheapest; force the planner
+            # to show whether an index path exists at all.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute('EXPLAIN ' + sql)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            problems = re.findall(r'Seq Scan on tracker_\w+|(?:^|->)\s*Sort\b', plan, re.MULTILINE)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            problems = re.findall(r'SCAN tracker_\w+|USE TEMP B-TREE FOR ORDER BY', plan)
+        return plan, problems
+
+    def test_tracker_view_queries_use_indexes(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Plan checks only understand SQLite and PostgreSQL output')
+        for name in self.VIEWS:
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(reverse(f'tracker:{name}'))
+            statements = [q['sql'] for q in captured
+                          if q['sql'].startswith('SELECT') and 'tracker_' in q['sql']]
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    plan, problems = self.explain(cursor, sql)
+                    with self.subTest(view=name, sql=sql):
+                        self.assertEqual(problems, [], plan)
+
+
+class TrackerStatsTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        for days_ago, weight in [(2, 72), (1, 71), (0, 70.5)]:
+            WeightEntry.objects.create(user=self.user, weight=weight, date=self.today - timedelta(days=days_ago))
+        Nutrition.objects.create(user=self.user, meal_type='lunch', food_name='Salad', calories=400, protein=20)
+        Nutrition.objects.create(user=self.user, meal_type='dinner', food_name='Pasta', calories=700,
+                                 date=self.today - timedelta(days=1))
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=30, calories_burned=300)
+        WaterIntake.objects.create(user=self.user, amount=500)
+        Mood.objects.create(user=self.user, mood=4)
+        now = timezone.now()
+        for days_ago, hours in [(1, 6), (2, 8), (3, 10)]:
+            wake_time = now - timedelta(days=days_ago)
+            Sleep.objects.create(user=self.user, quality=5, wake_time=wake_time,
+                                 sleep_time=wake_time - timedelta(hours=hours))
+        self.client.force_login(self.user)
+
+    def test_weight_stats(self):
+        response = self.client.get(reverse('tracker:weight_tracker'))
+        self.assertEqual(response.context['latest_weight'], Decimal('70.5'))
+        self.assertEqual(response.context['first_weight'], Decimal('72'))
+        self.assertEqual(response.context['weight_change'], Decimal('-1.5'))
+        self.assertAlmostEqual(float(response.context['avg_weight']), 71.1667, places=3)
+        self.assertEqual(response.context['page_obj'].paginator.count, 3)
+
+    def test_nutrition_stats_mix_today_and_all_time(self):
+        response = self.client.get(reverse('tracker:nutrition_tracker'))
+        self.assertEqual(response.context['today_calories'], 400)
+        self.assertEqual(response.context['today_protein'], 20)
+        self.assertEqual(response.context['today_fat'], 0)
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    def test_sleep_duration_is_aggregated_in_sql(self):
+        response = self.client.get(reverse('tracker:sleep_tracker'))
+        self.assertEqual(response.context['avg_sleep_duration'], 8.0)
+        self.assertEqual(response.context['total_sleep_hours'], 24.0)
+        self.assertEqual(
+            [response.context[key] for key in ('short_nights', 'recommended_nights', 'long_nights')],
+            [1, 1, 1],
+        )
+
+    def test_tracker_pages_run_one_stats_query(self):
+        # session + user, the stats query and the page of rows; the weight page also reads its trend
+        for name, queries in [('weight_tracker', 5), ('exercise_tracker', 4), ('nutrition_tracker', 4),
+                              ('sleep_tracker', 4), ('water_tracker', 4), ('mood_tracker', 4)]:
+            with self.subTest(view=name), self.assertNumQueries(queries):
+                self.client.get(reverse(f'tracker:{name}'))
+
+
+class ChartDataTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        WeightEntry.objects.bulk_create([
+            WeightEntry(user=self.user, weight=70 + days_ago % 5, date=self.today - timedelta(days=days_ago))
+            for days_ago in range(400)
+        ])
+        for days_ago in range(14):
+            WaterIntake.objects.create(user=self.user, amount=1000, date=self.today - timedelta(days=days_ago))
+        self.client.force_login(self.user)
+
+    def get(self, **params):
+        return self.client.get(reverse('tracker:chart_data'), params).json()
+
+    def test_auto_bucket_follows_range(self):
+        self.assertEqual(self.get(days=30)['bucket'], 'day')
+        self.assertEqual(self.get(days=365)['bucket'], 'week')
+        self.assertEqual(self.get(days=3000)['bucket'], 'month')
+
+    def test_buckets_are_summed_in_the_database(self):
+        data = self.get(days=13, bucket='day')
+        self.assertEqual(len(data['water_data']['date']), 14)
+        data = self.get(days=400, bucket='week')
+        self.assertEqual(sum(data['water_data']['total_amount']), 14000)
+        self.assertLessEqual(len(data['water_data']['date']), 3)
+
+    def test_weight_series_stays_within_point_budget(self):
+        data = charts.weight_series(self.user, self.today - timedelta(days=400), self.today, 'day')
+        self.assertEqual(len(data['weight']), MAX_POINTS)
+        self.assertEqual(data['date'][-1], self.today)
+
+    def test_explicit_buckets_cannot_exceed_point_budget(self):
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=30,
+                                calories_burned=300, date=self.today - timedelta(days=3000))
+        data = self.get(days=3650, bucket='day')
+        self.assertEqual(data['bucket'], 'month')
+        for series in ['weight_data', 'exercise_data', 'water_data']:
+            self.assertLessEqual(len(data[series]['date']), MAX_POINTS)
+        self.assertEqual(self.get(days=400, bucket='day')['bucket'], 'week')
+        self.assertEqual(self.get(days=150, bucket='day')['bucket'], 'day')
+
+    def test_conditional_get(self):
+        url = reverse('tracker:chart_data')
+        response = self.client.get(url, {'days': 30})
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'days': 30}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('tracker_' in q['sql'] for q in queries))
+
+        self.assertEqual(self.client.get(url, {'days': 90}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        WaterIntake.objects.create(user=self.user, amount=250)
+        self.assertEqual(self.client.get(url, {'days': 30}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_equivalent_buckets_share_a_cache_entry(self):
+        self.get(days=30)
+        for bucket in ['auto', '', 'foo', 'day']:
+            with self.subTest(bucket=bucket), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.get(days=30, bucket=bucket)['bucket'], 'day')
+            self.assertFalse(any('tracker_' in q['sql'] for q in queries))
+
+    def test_invalid_days_falls_back_to_default(self):
+        self.assertEqual(len(self.get(days='abc', bucket='day')['water_data']['date']), 14)
+
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        points = [(x, 100 if x == 500 else x % 7) for x in range(1000)]
+        sampled = largest_triangle_three_buckets(points, 50)
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertIn((500, 100), sampled)
+
+
+class AnalyticsTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        for days_ago in range(120):
+            date = self.today - timedelta(days=days_ago)
+            WeightEntry.objects.create(user=self.user, weight=80 - days_ago / 100, date=date)
+            if days_ago % 2 == 0:
+                Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run',
+                                        duration=30, calories_burned=300, date=date)
+            Nutrition.objects.create(user=self.user, meal_type='lunch', food_name='Salad', calories=400, date=date)
+            Nutrition.objects.create(user=self.user, meal_type='dinner', food_name='Pasta', calories=700, date=date)
+        self.client.force_login(self.user)
+
+    def test_summary_values(self):
+        summary = self.client.get(reverse('tracker:analytics'), {'days': 30}).context['summary']
+        self.assertEqual(summary.weight_count, 31)
+        self.assertAlmostEqual(summary.first_weight, 79.7)
+        self.assertAlmostEqual(summary.last_weight, 80.0)
+        self.assertAlmostEqual(summary.weight_change, 0.3)
+        self.assertEqual(summary.workout_count, 16)
+        self.assertEqual(summary.latest_workout, self.today)
+        self.assertEqual(summary.meal_count, 62)
+        self.assertEqual(summary.nutrition_days, 31)
+
+    def test_query_count_is_bounded_for_every_range(self):
+        # session + user + one query per model + the latest trends
+        for days in (7, 30, 90, 365):
+            with self.subTest(days=days), self.assertNumQueries(6):
+                self.client.get(reverse('tracker:analytics'), {'days': days})
+
+    def test_chart_series_are_one_json_island_of_parallel_arrays(self):
+        content = self.client.get(reverse('tracker:analytics'), {'days': 30}).content.decode()
+        island = re.search(r'<script id="analytics-chart-data" type="application/json">(.*?)</script>', content)
+        data = json.loads(island.group(1))
+        self.assertEqual(set(data['weight']), {'date', 'weight'})
+        self.assertEqual(len(data['weight']['date']), 31)
+        self.assertEqual((data['weight']['date'][-1], data['weight']['weight'][-1]), (self.today.isoformat(), 80.0))
+        self.assertEqual(sum(data['exercise']['calories']), 16 * 300)
+        self.assertEqual(sum(data['nutrition']['calories']), 31 * 1100)
+
+    def test_json_script_escapes_markup(self):
+        html = charts.json_script({'date': [self.today], 'note': ['</script><b>&'], 'weight': [Decimal('70.5')]}, 'x')
+        self.assertNotIn('</script><b>', html)
+        payload = re.fullmatch(r'<script id="x" type="application/json">(.*)</script>', html).group(1)
+        self.assertEqual(json.loads(payload),
+                         {'date': [self.today.isoformat()], 'note': ['</script><b>&'], 'weight': [70.5]})
+
+
+class CachingTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.client.force_login(self.user)
+
+    def test_repeat_views_are_served_from_cache(self):
+        for name in ['dashboard', 'exercise_tracker', 'analytics', 'chart_data']:
+            url = reverse(f'tracker:{name}')
+            with CaptureQueriesContext(connection) as first:
+                self.client.get(url)
+            with CaptureQueriesContext(connection) as second:
+                self.client.get(url)
+            with self.subTest(view=name):
+                self.assertLess(len(second), len(first))
+
+    def test_writes_through_views_invalidate(self):
+        url = reverse('tracker:exercise_tracker')
+        self.assertEqual(self.client.get(url).context['total_exercises'], 0)
+        self.client.post(reverse('tracker:quick_add'), {'action_type': 'exercise', 'value': 'Run'})
+        self.assertEqual(self.client.get(url).context['total_exercises'], 1)
+
+        exercise = Exercise.objects.get()
+        self.client.post(reverse('tracker:edit_entry', args=['exercise', exercise.pk]), {
+            'exercise_type': 'cardio', 'name': 'Run', 'duration': 30, 'calories_burned': 999,
+            'date': exercise.date.isoformat(),
+        })
+        self.assertEqual(self.client.get(url).context['total_calories'], 999)
+
+        self.client.post(reverse('tracker:delete_entry', args=['exercise', exercise.pk]))
+        self.assertEqual(self.client.get(url).context['total_exercises'], 0)
+
+    def test_versions_are_per_user(self):
+        other = User.objects.create_user('bob', password='secret-pass-123')
+        self.client.get(reverse('tracker:mood_tracker'))
+        Mood.objects.create(user=other, mood=5)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('tracker:mood_tracker'))
+        self.assertFalse(any('COUNT' in q['sql'] for q in queries))
+
+
+class ImportTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+
+    def test_json_reader_handles_arrays_and_json_lines_across_chunks(self):
+        records = [{'weight': '70.5', 'date': '2024-01-01'}, {'weight': '71', 'notes': 'a, [b] {c}'}]
+        for text in ['[' + ', '.join(map(json.dumps, records)) + ']', '\n'.join(map(json.dumps, records))]:
+            self.assertEqual(list(iter_json_records(io.StringIO(text), chunk_size=7)), records)
+
+    def test_weight_import_upserts_on_user_and_date(self):
+        WeightEntry.objects.create(user=self.user, weight=80, date='2024-01-01')
+        rows = 'weight,date,notes\n70.5,2024-01-01,replaced\n71,2024-01-02,\n71.5,2024-01-02,last wins\n'
+        result = Importer(self.user, 'weight', batch_size=2).run(iter_csv_records(io.StringIO(rows)))
+        self.assertEqual(result.error_count, 0)
+        self.assertEqual(
+            list(WeightEntry.objects.order_by('date').values_list('weight', 'notes')),
+            [(Decimal('70.5'), 'replaced'), (Decimal('71.5'), 'last wins')],
+        )
+        self.assertEqual(DailySummary.objects.get(user=self.user, date='2024-01-01').weight, Decimal('70.5'))
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        rows = [
+            {'sleep_time': '2024-01-01 23:00', 'wake_time': '2024-01-02 07:00', 'quality': '8'},
+            {'sleep_time': '2024-01-02 23:00', 'wake_time': '2024-01-02 22:00', 'quality': '8'},
+            {'sleep_time': '2024-01-03 23:00', 'wake_time': '2024-01-04 07:00', 'quality': '11'},
+        ]
+        result = Importer(self.user, 'sleep').run(rows)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, errors in result.errors], [2, 3])
+        self.assertIn('__all__', result.errors[0][1])
+        self.assertIn('quality', result.errors[1][1])
+
+    def test_bulk_import_refreshes_summaries_in_bulk(self):
+        rows = [{'amount': '250', 'date': f'2024-01-{day:02d}'} for day in range(1, 29) for _ in range(4)]
+        Importer(self.user, 'water').run(rows)
+        self.assertEqual(DailySummary.objects.filter(user=self.user, water_amount=1000).count(), 28)
+
+    def test_imported_goals_are_evaluated_against_existing_entries(self):
+        WeightEntry.objects.create(user=self.user, weight=90, date='2024-01-01')
+        WeightEntry.objects.create(user=self.user, weight=85, date='2024-01-10')
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=30,
+                                calories_burned=300, date='2024-01-05')
+        rows = [
+            {'goal_type': goal_type, 'title': goal_type, 'description': 'Imported', 'target_value': target,
+             'start_date': '2024-01-01', 'target_date': '2024-02-01'}
+            for goal_type, target in [('weight', 80), ('exercise', 120)]
+        ]
+        self.assertEqual(Importer(self.user, 'goal').run(rows).imported, 2)
+        goals = {goal.goal_type: goal
+                 for goal in with_progress(HealthGoal.objects.filter(user=self.user), timezone.now().date())}
+        self.assertEqual((goals['weight'].current_value, goals['weight'].start_value), (85, 90))
+        self.assertEqual(goals['weight'].progress_percentage, 50)
+        self.assertEqual(goals['exercise'].current_value, 30)
+        self.assertEqual(goals['exercise'].progress_percentage, 25)
+
+    def test_upload_view_and_management_command(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('mood.json', b'[{"mood": 4, "date": "2024-01-01"}]')
+        response = self.client.post(reverse('tracker:import_data'),
+                                    {'model_name': 'mood', 'file_format': 'json', 'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Mood.objects.get(user=self.user).mood, 4)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('meal_type,food_name,calories,date\nlunch,Soup,300,2024-01-01\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('import_tracker_data', 'alice', 'nutrition', f.name, stdout=io.StringIO())
+        self.assertEqual(DailySummary.objects.get(user=self.user, date='2024-01-01').calories_consumed, 300)
+
+
+class ExportTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        WeightEntry.objects.create(user=self.user, weight=70.5, date='2024-01-01')
+        WeightEntry.objects.create(user=self.user, weight=71, date='2024-01-02')
+        Mood.objects.create(user=self.user, mood=4, date='2024-01-01', notes='fine, "ok"')
+        self.client.force_login(self.user)
+
+    def download(self, **params):
+        response = self.client.get(reverse('tracker:export_data'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_round_trips_through_the_importer(self):
+        data = self.download(format='csv', model='weight').decode()
+        self.assertTrue(data.startswith('weight,date,notes,created_at'))
+        other = User.objects.create_user('bob', password='secret-pass-123')
+        result = Importer(other, 'weight').run(iter_csv_records(io.StringIO(data)))
+        self.assertEqual(result.imported, 2)
+
+    def test_ndjson_and_zip_exports_cover_every_model(self):
+        lines = [json.loads(line) for line in self.download(format='ndjson').splitlines()]
+        self.assertEqual([line['model'] for line in lines], ['weight', 'weight', 'mood'])
+        self.assertEqual(lines[2]['notes'], 'fine, "ok"')
+
+        with zipfile.ZipFile(io.BytesIO(self.download())) as archive:
+            self.assertIn('goal.csv', archive.namelist())
+            self.assertEqual(len(archive.read('weight.csv').decode().splitlines()), 3)
+
+    def test_rejects_csv_without_model(self):
+        self.assertEqual(self.client.get(reverse('tracker:export_data'), {'format': 'csv'}).status_code, 400)
+
+
+class KeysetPaginationTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        today = timezone.now().date()
+        # Three workouts a day, so pages have to break ties on id within a date.
+        Exercise.objects.bulk_create([
+            Exercise(user=self.user, exercise_type='cardio', name=f'Run {i}', duration=30, calories_burned=200,
+                     date=today - timedelta(days=i // 3))
+            for i in range(50)
+        ])
+        self.expected = list(Exercise.objects.filter(user=self.user).order_by('-date', '-id')
+                             .values_list('id', flat=True))
+        self.client.force_login(self.user)
+
+    def get_page(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        return self.client.get(reverse('tracker:exercise_tracker'), params).context['page_obj']
+
+    def test_walks_every_row_once_in_both_directions(self):
+        pages = [self.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [20, 20, 10])
+        self.assertEqual([entry.id for page in pages for entry in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertEqual(pages[0].paginator.count, 50)
+
+        back = self.get_page(pages[2].previous_cursor)
+        self.assertEqual([entry.id for entry in back], [entry.id for entry in pages[1]])
+        self.assertEqual([entry.id for entry in self.get_page(back.previous_cursor)],
+                         [entry.id for entry in pages[0]])
+
+    def test_deep_pages_cost_the_same_as_the_first(self):
+        cursor = self.get_page().next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.get_page(cursor)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('COUNT(', sql.upper())
+        self.assertNotIn('OFFSET', sql.upper())
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        for cursor in ['not-a-cursor', 'WzAsWzFdXQ']:
+            with self.subTest(cursor=cursor):
+                self.assertEqual([entry.id for entry in self.get_page(cursor)], self.expected[:20])
+
+    def test_sleep_pages_follow_sleep_time(self):
+        now = timezone.now()
+        for days_ago in range(25):
+            wake_time = now - timedelta(days=days_ago)
+            Sleep.objects.create(user=self.user, quality=4, wake_time=wake_time,
+                                 sleep_time=wake_time - timedelta(hours=8))
+        first = self.client.get(reverse('tracker:sleep_tracker')).context['page_obj']
+        second = self.client.get(reverse('tracker:sleep_tracker'), {'cursor': first.next_cursor}).context['page_obj']
+        times = [entry.sleep_time for entry in [*first, *second]]
+        self.assertEqual(len(times), 25)
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    def walk(self, url_name):
+        """Every page forwards, then back from the last; ids per page"""
+        def get(cursor=None):
+            return self.client.get(reverse(url_name), {'cursor': cursor} if cursor else {}).context['page_obj']
+        pages = [get()]
+        while pages[-1].has_next():
+            pages.append(get(pages[-1].next_cursor))
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(get(back[-1].previous_cursor))
+        return ([[entry.id for entry in page] for page in pages],
+                [[entry.id for entry in page] for page in reversed(back)])
+
+    def test_cursors_keep_microseconds(self):
+        now = timezone.now()
+        # Times within the same millisecond, as the timezone.now defaults write them
+        WaterIntake.objects.bulk_create([
+            WaterIntake(user=self.user, amount=250, date=now.date(), time=time(9, 0, i // 3, 100 + i))
+            for i in range(45)
+        ])
+        Sleep.objects.bulk_create([
+            Sleep(user=self.user, quality=4, sleep_time=now - timedelta(days=i // 3, microseconds=i),
+                  wake_time=now - timedelta(days=i // 3, hours=-8))
+            for i in range(45)
+        ])
+        for url_name, expected in [
+            ('tracker:water_tracker', WaterIntake.objects.order_by('-date', '-time', '-id')),
+            ('tracker:sleep_tracker', Sleep.objects.order_by('-sleep_time', '-id')),
+        ]:
+            with self.subTest(url_name):
+                forwards, backwards = self.walk(url_name)
+                self.assertEqual([entry for page in forwards for entry in page],
+                                 list(expected.values_list('id', flat=True)))
+                self.assertEqual(backwards, forwards)
+
+
+class GoalProgressTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        self.start = self.today - timedelta(days=10)
+
+    def goal(self, goal_type, target_value=100, **kwargs):
+        return HealthGoal.objects.create(
+            user=self.user, goal_type=goal_type, title=goal_type, description='', target_value=target_value,
+            start_date=self.start, target_date=self.today + timedelta(days=10), **kwargs,
+        )
+
+    def current(self, goal):
+        goal.refresh_from_db()
+        return goal.current_value
+
+    def test_entries_update_matching_goals_within_their_window(self):
+        weight, exercise, water = self.goal('weight'), self.goal('exercise'), self.goal('water')
+        WeightEntry.objects.create(user=self.user, weight=80, date=self.start - timedelta(days=1))
+        WeightEntry.objects.create(user=self.user, weight=78.5, date=self.start + timedelta(days=1))
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=30,
+                                calories_burned=300)
+        run = Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=45,
+                                      calories_burned=400)
+        WaterIntake.objects.create(user=self.user, amount=500, date=self.today)
+        WaterIntake.objects.create(user=self.user, amount=1500, date=self.today)
+        WaterIntake.objects.create(user=self.user, amount=1000, date=self.today - timedelta(days=1))
+
+        self.assertEqual(self.current(weight), Decimal('78.50'))
+        self.assertEqual(self.current(exercise), 75)
+        self.assertEqual(self.current(water), 1500)
+
+        run.delete()
+        self.assertEqual(self.current(exercise), 30)
+
+    def progress(self, goal):
+        return with_progress(HealthGoal.objects.filter(pk=goal.pk), self.today).get().progress_percentage
+
+    def weigh_in(self, weight):
+        # One weigh-in a day, from the goal's start date on
+        days = WeightEntry.objects.filter(user=self.user).count()
+        WeightEntry.objects.create(user=self.user, weight=weight, date=self.start + timedelta(days=days))
+
+    def test_weight_loss_goal_measures_progress_from_the_first_weigh_in(self):
+        goal = self.goal('weight', target_value=70)
+        self.assertEqual(self.progress(goal), 0)
+        self.weigh_in(95)
+        self.assertEqual((self.current(goal), goal.start_value), (95, 95))
+        self.assertEqual(self.progress(goal), 0)
+        self.weigh_in(85)
+        self.assertEqual(self.progress(goal), 40)
+        self.weigh_in(68)
+        self.assertEqual(self.progress(goal), 100)
+        self.weigh_in(97)
+        self.assertEqual(self.progress(goal), 0)
+
+    def test_weight_gain_goal_measures_progress_from_the_first_weigh_in(self):
+        goal = self.goal('weight', target_value=60)
+        self.weigh_in(55)
+        self.weigh_in(58)
+        self.assertEqual((self.current(goal), goal.start_value), (58, 55))
+        self.assertEqual(self.progress(goal), 60)
+        self.weigh_in(61)
+        self.assertEqual(self.progress(goal), 100)
+
+    def test_sleep_goal_averages_hours(self):
+        goal = self.goal('sleep')
+        now = timezone.now()
+        for days_ago, duration in [(1, 6), (2, 8)]:
+            wake_time = now - timedelta(days=days_ago)
+            Sleep.objects.create(user=self.user, quality=4, wake_time=wake_time,
+                                 sleep_time=wake_time - timedelta(hours=duration))
+        self.assertEqual(self.current(goal), 7)
+
+    def test_new_goal_picks_up_existing_entries_and_general_goals_are_left_alone(self):
+        Nutrition.objects.create(user=self.user, meal_type='lunch', food_name='Salad', calories=400)
+        Nutrition.objects.create(user=self.user, meal_type='dinner', food_name='Pasta', calories=800)
+        self.assertEqual(self.current(self.goal('nutrition')), 1200)
+        self.assertEqual(self.current(self.goal('general', current_value=5)), 5)
+
+    def test_import_refreshes_goals(self):
+        goal = self.goal('exercise')
+        data = f'exercise_type,name,duration,calories_burned,date\ncardio,Run,40,300,{self.today}\n'
+        Importer(self.user, 'exercise').run(iter_csv_records(io.StringIO(data)))
+        self.assertEqual(self.current(goal), 40)
+
+    def test_all_goals_are_evaluated_in_one_query(self):
+        for goal_type in ['weight', 'exercise', 'nutrition', 'sleep', 'water'] * 4:
+            self.goal(goal_type)
+        with self.assertNumQueries(1):
+            list(evaluate_goals(HealthGoal.objects.filter(user=self.user)))
+
+
+class GoalsPageTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        self.client.force_login(self.user)
+
+    def goal(self, status, target_date, **kwargs):
+        return HealthGoal.objects.create(
+            user=self.user, goal_type='general', title=status, description='', status=status,
+            start_date=self.today - timedelta(days=30), target_date=target_date, **kwargs,
+        )
+
+    def test_goals_page_runs_one_goal_query(self):
+        for days in range(1, 11):
+            self.goal('active', self.today + timedelta(days=days))
+            self.goal('completed', self.today - timedelta(days=days))
+            self.goal('paused', self.today + timedelta(days=days))
+        # session + user + the goals
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tracker:goals'))
+        self.assertEqual(len(response.context['active_goals']), 10)
+        self.assertEqual(response.context['total_goals'], 30)
+        deadlines = [goal.target_date for goal in response.context['active_goals']]
+        self.assertEqual(deadlines, sorted(deadlines))
+
+    def test_progress_and_overdue_are_annotated(self):
+        overdue = self.goal('active', self.today - timedelta(days=1), target_value=3, current_value=1)
+        self.goal('active', self.today + timedelta(days=1), target_value=70, current_value=75)
+        self.goal('completed', self.today - timedelta(days=1))
+        response = self.client.get(reverse('tracker:goals'))
+        goals = {goal.pk: goal for goal in response.context['active_goals']}
+        self.assertTrue(goals[overdue.pk].is_overdue)
+        self.assertAlmostEqual(goals[overdue.pk].progress_percentage, 33.3)
+        self.assertEqual([goal.progress_percentage for goal in goals.values()], [33.3, 100])
+        self.assertEqual(response.context['overdue_goals'], 1)
+        self.assertContains(response, 'past the target date')
+
+
+@override_settings(
+    MIDDLEWARE=['tracker.profiling.ProfilingMiddleware'] + settings.MIDDLEWARE,
+    PROFILING_DIR=None,
+)
+class ProfilingTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        profiling.reset()
+        profiling.install()
+        self.addCleanup(profiling.uninstall)
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.client.force_login(self.user)
+
+    def test_histogram_percentiles_are_close(self):
+        histogram = profiling.Histogram()
+        for value in range(1, 1001):
+            histogram.add(value)
+        for q in profiling.PERCENTILES:
+            self.assertAlmostEqual(histogram.percentile(q), q * 10, delta=q * 10 * 0.05)
+
+        copy = profiling.Histogram()
+        copy.merge(json.loads(json.dumps(histogram.to_dict())))
+        self.assertEqual(copy.percentile(95), histogram.percentile(95))
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('tracker:dashboard'))
+        self.client.get(reverse('tracker:dashboard'))
+        self.client.get(reverse('tracker:goals'))
+        report = profiling.report()
+        dashboard = report['tracker:dashboard']
+        self.assertEqual(dashboard['requests'], 2)
+        self.assertGreater(dashboard['queries']['max'], 0)
+        self.assertGreater(dashboard['template_ms']['max'], 0)
+        self.assertGreaterEqual(dashboard['wall_ms']['max'], dashboard['sql_ms']['max'])
+        self.assertEqual(report['tracker:goals']['requests'], 1)
+
+    def test_repeated_sql_shapes_are_flagged(self):
+        for day in range(6):
+            WeightEntry.objects.create(user=self.user, weight=70, date=timezone.now().date() - timedelta(days=day))
+
+        def view(request):
+            for entry in WeightEntry.objects.filter(user=self.user):
+                User.objects.get(pk=entry.user_id)
+            return HttpResponse()
+
+        request = RequestFactory().get('/weight/')
+        request.resolver_match = resolve(reverse('tracker:weight_tracker'))
+        with self.assertLogs('tracker.profiling', 'WARNING') as logs:
+            profiling.ProfilingMiddleware(view)(request)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('Possible N+1 in tracker:weight_tracker: 6x SELECT', logs.output[0])
+        flagged = profiling.report()['tracker:weight_tracker']['n_plus_one']
+        self.assertEqual(len(flagged), 1)
+        self.assertEqual(flagged[0]['max_repeats'], 6)
+        self.assertIn('auth_user', flagged[0]['sql'])
+
+    async def test_async_views_are_profiled_without_a_thread_adapter(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('tracker:dashboard_async'))
+        self.assertEqual(response.status_code, 200)
+        dashboard = profiling.report()['tracker:dashboard_async']
+        self.assertEqual(dashboard['requests'], 1)
+        self.assertGreater(dashboard['queries']['max'], 0)
+        self.assertGreater(dashboard['template_ms']['max'], 0)
+
+        async def view(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(profiling.ProfilingMiddleware(view)))
+
+    def test_report_is_staff_only_and_available_from_the_command(self):
+        self.client.get(reverse('tracker:dashboard'))
+        self.assertEqual(self.client.get(reverse('tracker:profiling_report')).status_code, 302)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get(reverse('tracker:profiling_report'), {'sort': 'requests'})
+        self.assertIn('tracker:dashboard', response.json()['views'])
+
+        out = io.StringIO()
+        call_command('profiling_report', stdout=out)
+        self.assertIn('tracker:dashboard', out.getvalue())
+
+
+class BenchmarkTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.counts = generate_user('bench_1', 40, rng=random.Random(1))
+
+    def test_synthetic_history_keeps_derived_data_current(self):
+        self.assertEqual(self.counts['WeightEntry'], 40)
+        self.assertEqual(self.counts['Sleep'], 40)
+        self.assertGreaterEqual(self.counts['Nutrition'], 120)
+        self.assertEqual(DailySummary.objects.filter(user=self.user).count(), 40)
+        goal = HealthGoal.objects.get(user=self.user, goal_type='weight')
+        self.assertEqual(goal.current_value, WeightEntry.objects.filter(user=self.user).latest('date').weight)
+
+    def test_benchmark_reports_and_compares_against_baseline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, 'report.json')
+            call_command('benchmark', iterations=2, warmup=0, output=report_path, stderr=io.StringIO(),
+                         views=['tracker:dashboard', 'tracker:edit_entry'])
+            with open(report_path) as f:
+                report = json.load(f)
+            self.assertEqual(set(report['views']), {'tracker:dashboard', 'tracker:edit_entry'})
+            self.assertEqual(report['views']['tracker:dashboard']['status'], 200)
+            self.assertEqual(report['meta']['rows']['weight'], 40)
+
+            report['views']['tracker:dashboard'].update(p95_ms=0.001, queries=0)
+            with open(report_path, 'w') as f:
+                json.dump(report, f)
+            with self.assertRaises(CommandError):
+                call_command('benchmark', iterations=1, warmup=0, baseline=report_path, fail_on_regression=True,
+                             views=['tracker:dashboard'], stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_template_benchmark_compares_loaders(self):
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = os.path.join(directory, 'report.json')
+            call_command('benchmark_templates', iterations=2, warmup=0, output=report_path, stderr=io.StringIO(),
+                         views=['tracker:dashboard', 'tracker:goals'])
+            with open(report_path) as f:
+                report = json.load(f)
+        self.assertEqual(set(report['templates']), {'tracker/dashboard.html', 'tracker/goals.html'})
+        self.assertEqual(set(report['templates']['tracker/goals.html']), {'before', 'after', 'p50_speedup'})
+
+
+class TemplateFragmentTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user('alice', password='secret-pass-123')
+        self.bob = User.objects.create_user('bob', password='secret-pass-123')
+
+    def test_navbar_is_cached_per_user(self):
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse('tracker:dashboard')), 'bi-person-circle me-1"></i>alice')
+        self.client.force_login(self.bob)
+        response = self.client.get(reverse('tracker:goals'))
+        self.assertContains(response, 'bi-person-circle me-1"></i>bob')
+        self.assertNotContains(response, 'alice')
+        self.client.logout()
+        self.assertContains(self.client.get(reverse('tracker:home')), reverse('tracker:register'))
+
+    def test_logout_works_from_a_cached_navbar_after_logging_in_again(self):
+        def token(url, form):
+            content = client.get(url).content.decode()
+            return re.search(form + r'.*?name="csrfmiddlewaretoken" value="([^"]+)"', content, re.S).group(1)
+
+        client = self.client_class(enforce_csrf_checks=True)
+        for _ in range(2):
+            client.post(reverse('login'), {'username': 'alice', 'password': 'secret-pass-123',
+                                           'csrfmiddlewaretoken': token(reverse('login'), '<form')})
+            logout_token = token(reverse('tracker:dashboard'), 'id="logout-form"')
+            response = client.post(reverse('logout'), {'csrfmiddlewaretoken': logout_token})
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn('_auth_user_id', client.session)
+
+
+class QuickAddBatchTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        self.client.force_login(self.user)
+
+    def post(self, payload):
+        return self.client.post(reverse('tracker:quick_add_batch'), json.dumps(payload),
+                                content_type='application/json')
+
+    def test_writes_every_type_in_one_request(self):
+        yesterday = str(self.today - timedelta(days=1))
+        response = self.post([
+            {'type': 'water', 'value': 250},
+            {'type': 'water', 'value': 500, 'date': yesterday, 'time': '08:30'},
+            {'type': 'exercise', 'value': 'Walk', 'duration': 45},
+            {'type': 'nutrition', 'value': 'Apple', 'calories': 95},
+            {'type': 'weight', 'value': '71.2'},
+            {'type': 'mood', 'value': 4, 'notes': 'good'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 6)
+        self.assertEqual(WaterIntake.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Exercise.objects.get(user=self.user).duration, 45)
+        self.assertEqual(Exercise.objects.get(user=self.user).calories_burned, 150)
+        summary = DailySummary.objects.get(user=self.user, date=self.today)
+        self.assertEqual((summary.water_amount, summary.meal_count, summary.mood), (250, 1, 4))
+
+    def test_reports_per_item_errors_and_respects_one_entry_per_day(self):
+        WeightEntry.objects.create(user=self.user, weight=70, date=self.today)
+        response = self.post({'entries': [
+            {'type': 'weight', 'value': 71},
+            {'type': 'mood', 'value': 3},
+            {'type': 'mood', 'value': 5},
+            {'type': 'mood', 'value': 9, 'date': str(self.today - timedelta(days=1))},
+            {'type': 'sleep'},
+            {'type': 'water', 'value': 300},
+        ]})
+        self.assertEqual(response.status_code, 207)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results],
+                         ['error', 'created', 'error', 'error', 'error', 'created'])
+        self.assertIn('date', results[0]['errors'])
+        self.assertIn('date', results[2]['errors'])
+        self.assertIn('mood', results[3]['errors'])
+        self.assertEqual(WeightEntry.objects.get(user=self.user).weight, 70)
+
+    def test_atomic_batches_write_nothing_on_any_error(self):
+        response = self.post({'atomic': True, 'entries': [{'type': 'water', 'value': 300}, {'type': 'water'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['skipped', 'error'])
+        self.assertFalse(WaterIntake.objects.exists())
+
+    def test_batch_runs_one_insert_per_model(self):
+        entries = [{'type': 'water', 'value': 250}] * 50 + [{'type': 'exercise', 'value': 'Run'}] * 20
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post(entries).status_code, 201)
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "tracker_')]
+        self.assertEqual(len([sql for sql in inserts if 'tracker_waterintake' in sql]), 1)
+        self.assertEqual(len([sql for sql in inserts if 'tracker_exercise' in sql]), 1)
+
+    def test_rejects_non_list_bodies(self):
+        self.assertEqual(self.post({'entries': 'water'}).status_code, 400)
+        self.assertEqual(self.client.post(reverse('tracker:quick_add_batch'), 'nope',
+                                          content_type='application/json').status_code, 400)
+
+
+class AsyncViewTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, _ = generate_user('alice', 20, rng=random.Random(2), password='secret-pass-123')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    async def test_async_views_match_sync_views(self):
+        for sync_name, async_name, query in [
+            ('dashboard', 'dashboard_async', ''),
+            ('analytics', 'analytics_async', '?days=365'),
+        ]:
+            expected = await sync_to_async(self.client.get)(reverse(f'tracker:{sync_name}') + query)
+            await cache.aclear()
+            response = await self.async_client.get(reverse(f'tracker:{async_name}') + query)
+            self.assertEqual(response.status_code, 200)
+            # Only the masked CSRF token differs between two renders.
+            csrf = re.compile(rb'name="csrfmiddlewaretoken" value="[^"]+"')
+            self.assertEqual(csrf.sub(b'', response.content), csrf.sub(b'', expected.content))
+
+    async def test_chart_data_honours_etag(self):
+        url = reverse('tracker:chart_data_async')
+        response = await self.async_client.get(url, {'days': 90})
+        expected = await sync_to_async(self.client.get)(reverse('tracker:chart_data'), {'days': 90})
+        self.assertEqual(response.json(), expected.json())
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        cached = await self.async_client.get(url, {'days': 90}, headers={'if-none-match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+    async def test_anonymous_requests_redirect_to_login(self):
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get(reverse('tracker:dashboard_async'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(settings.LOGIN_URL, response.url)
+
+
+class AsyncFanOutTests(TransactionTestCase):
+    async def test_gather_queries_runs_each_query_on_its_own_thread(self):
+        await sync_to_async(User.objects.create_user)('alice')
+        threads = []
+
+        def query(n):
+            def run():
+                threads.append(threading.get_ident())
+                return User.objects.filter(username='alice').count() + n
+            return run
+
+        self.assertEqual(await gather_queries(query(0), query(1), query(2)), [1, 2, 3])
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+class TrendTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        self.client.force_login(self.user)
+
+    def points(self, metric='weight'):
+        return list(TrendPoint.objects.filter(user=self.user, metric=metric).order_by('date')
+                    .values_list('date', 'value', 'average_7', 'average_30', 'trend', 'slope_30'))
+
+    def test_rolling_windows_trend_and_slope(self):
+        start = self.today - timedelta(days=39)
+        # Losing 0.1 kg a day for 40 days
+        stats = list(rolling([(start + timedelta(days=n), 80 - n / 10) for n in range(40)]))
+        day, value, average_7, average_30, trend, slope = stats[-1]
+        self.assertAlmostEqual(value, 76.1)
+        self.assertAlmostEqual(average_7, 76.4)
+        self.assertAlmostEqual(average_30, 77.55)
+        self.assertAlmostEqual(slope, -0.1)
+        self.assertGreater(trend, value)  # the trend lags a steady loss
+        self.assertIsNone(stats[0][5])
+
+    def test_signals_match_a_full_rebuild(self):
+        for days_ago in range(45):
+            WeightEntry.objects.create(user=self.user, weight=80 - days_ago % 5,
+                                       date=self.today - timedelta(days=days_ago))
+        entry = WeightEntry.objects.get(user=self.user, date=self.today - timedelta(days=20))
+        entry.weight = 90
+        entry.save()
+        WeightEntry.objects.get(user=self.user, date=self.today - timedelta(days=10)).delete()
+        entry.date = self.today - timedelta(days=60)
+        entry.save()
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=30, calories_burned=300)
+
+        incremental = {metric: self.points(metric) for metric in METRICS}
+        refresh_trends(self.user.pk)
+        self.assertEqual(incremental, {metric: self.points(metric) for metric in METRICS})
+        self.assertEqual(len(incremental['weight']), 44)
+        self.assertEqual(len(incremental['calories_out']), 1)
+
+    def test_pages_read_stored_trends(self):
+        for days_ago in range(10):
+            WeightEntry.objects.create(user=self.user, weight=70 + days_ago / 10,
+                                       date=self.today - timedelta(days=days_ago))
+        WaterIntake.objects.create(user=self.user, amount=500)
+        trend = self.client.get(reverse('tracker:weight_tracker')).context['trend']
+        self.assertEqual(trend.date, self.today)
+        self.assertAlmostEqual(trend.weekly_change, -0.7)
+        summary = self.client.get(reverse('tracker:analytics')).context['summary']
+        self.assertEqual([point.metric for point in summary.trends], ['weight', 'water'])
+
+    def test_bulk_writes_refresh_trends(self):
+        log_entries(self.user, [{'type': 'weight', 'value': 70, 'date': str(self.today - timedelta(days=1))},
+                                {'type': 'weight', 'value': 71}])
+        self.assertEqual([point[1] for point in self.points()], [70, 71])
+
+
+@skipUnless(correlations.AVAILABLE, 'NumPy is not installed')
+class CorrelationTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+        self.client.force_login(self.user)
+
+    def test_pearson_ignores_missing_days(self):
+        x = correlations.np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, float('nan')])
+        y = correlations.np.array([3, 5, 7, 9, 11, 13, 15, 17, 19, 21, float('nan'), 0])
+        self.assertEqual(correlations.pearson(x, y), (10, 1.0, 2.0))
+        self.assertEqual(correlations.pearson(x[:5], y[:5]), (5, None, None))
+
+    def test_sleep_predicts_next_day_mood(self):
+        tz = timezone.get_current_timezone()
+        for days_ago in range(1, 31):
+            night = self.today - timedelta(days=days_ago)
+            hours = 6 + days_ago % 4
+            bedtime = datetime.combine(night, time(23), tzinfo=tz)
+            Sleep.objects.create(user=self.user, quality=5, sleep_time=bedtime,
+                                 wake_time=bedtime + timedelta(hours=hours))
+            Mood.objects.create(user=self.user, mood=hours - 4, date=night + timedelta(days=1))
+
+        with self.assertNumQueries(4):  # session + user, summaries and sleep
+            report = self.client.get(reverse('tracker:correlations'), {'days': 90}).context['report']
+        by_key = {correlation.key: correlation for correlation in report.correlations}
+        self.assertEqual((by_key['sleep_mood'].pairs, by_key['sleep_mood'].r), (30, 1.0))
+        self.assertEqual(by_key['sleep_mood'].strength, 'strong')
+        self.assertIsNone(by_key['water_mood'].r)
+
+    def test_page_explains_missing_numpy(self):
+        with mock.patch.object(correlations, 'AVAILABLE', False):
+            response = self.client.get(reverse('tracker:correlations'))
+        self.assertContains(response, 'NumPy')
+
+
+@override_settings(BACKGROUND_JOBS=True)
+class BackgroundJobTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('alice', password='secret-pass-123')
+        self.today = timezone.now().date()
+
+    def test_writes_queue_one_job_per_day_until_the_worker_runs(self):
+        for amount in (250, 500, 330):
+            WaterIntake.objects.create(user=self.user, amount=amount)
+        entry = WeightEntry.objects.create(user=self.user, weight=70, date=self.today - timedelta(days=3))
+        entry.date = self.today - timedelta(days=2)
+        entry.save()
+        self.assertFalse(DailySummary.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            sorted(RecomputeJob.objects.values_list('source', 'date')),
+            [('tracker.waterintake', self.today), ('tracker.weightentry', self.today - timedelta(days=3)),
+             ('tracker.weightentry', self.today - timedelta(days=2))],
+        )
+
+        self.assertEqual(jobs.run_pending(), 3)
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today).water_amount, 1080)
+        self.assertEqual(DailySummary.objects.get(user=self.user, date=self.today - timedelta(days=2)).weight, 70)
+        self.assertFalse(DailySummary.objects.filter(user=self.user, date=self.today - timedelta(days=3)).exists())
+        self.assertEqual(TrendPoint.objects.filter(user=self.user, metric='weight').count(), 1)
+        self.assertFalse(RecomputeJob.objects.exists())
+
+    def test_goal_progress_catches_up(self):
+        goal = HealthGoal.objects.create(user=self.user, goal_type='exercise', title='Move', description='',
+                                         target_value=100, target_unit='minutes',
+                                         target_date=self.today + timedelta(days=30))
+        Exercise.objects.create(user=self.user, exercise_type='cardio', name='Run', duration=40, calories_burned=300)
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_value, 0)
+        jobs.run_pending()
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_value, 40)
+
+    def test_failures_are_retried_then_parked(self):
+        Mood.objects.create(user=self.user, mood=4)
+        with mock.patch('tracker.jobs.refresh_after_bulk_write', side_effect=RuntimeError('boom')), \
+                self.assertLogs('tracker.jobs', 'ERROR'):
+            for _ in range(jobs.MAX_ATTEMPTS):
+                self.assertEqual(jobs.run_pending(), 0)
+        job = RecomputeJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error),
+                         ('failed', jobs.MAX_ATTEMPTS, 'RuntimeError: boom'))
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_jobs_abandoned_by_a_worker_are_requeued(self):
+        Mood.objects.create(user=self.user, mood=4)
+        jobs.claim()
+        RecomputeJob.objects.update(claimed_at=timezone.now() - jobs.STALE_AFTER * 2)
+        # A new write to the same day queues its own job; the abandoned one is then redundant.
+        Mood.objects.filter(user=self.user).get().delete()
+        Mood.objects.create(user=self.user, mood=2)
+        with self.assertLogs('tracker.jobs', 'WARNING'):
+            self.assertEqual(jobs.run_pending(), 1)
+        self.assertFalse(RecomputeJob.objects.exists())
+        self.assertEqual(DailySummary.objects.get(user=self.user).mood, 2)
+
+
+class AdminChangelistTests(TrackerTestCase):
+    CHANGELISTS = ['userprofile', 'weightentry', 'exercise', 'healthgoal', 'mood', 'dailysummary']
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', password='secret-pass-123')
+        self.client.force_login(self.admin)
+        self.today = timezone.now().date()
+        self.users = 0
+
+    def add_users(self, count):
+        for _ in range(count):
+            self.users += 1
+            user = User.objects.create_user(f'user{self.users}')
+            UserProfile.objects.create(user=user, height=180 if self.users % 2 else None,
+                                       date_of_birth=self.today.replace(year=self.today.year - 20 - self.users))
+            WeightEntry.objects.create(user=user, weight=60 + self.users * 5)
+            Exercise.objects.create(user=user, exercise_type='cardio', name='Run', duration=30, calories_burned=300)
+            Mood.objects.create(user=user, mood=3)
+            HealthGoal.objects.create(user=user, goal_type='general', title='Goal', description='', target_value=100,
+                                      current_value=self.users * 10, target_date=self.today + timedelta(days=30))
+
+    def changelist(self, model, **params):
+        return self.client.get(reverse(f'admin:tracker_{model}_changelist'), params)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_users(2)
+        baseline = {}
+        for model in self.CHANGELISTS:
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.changelist(model).status_code, 200)
+            baseline[model] = len(captured)
+        self.add_users(10)
+        for model in self.CHANGELISTS:
+            with self.subTest(model=model), self.assertNumQueries(baseline[model]):
+                self.changelist(model)
+
+    def test_computed_columns_sort_and_filter(self):
+        self.add_users(4)
+        # user1 and user3 have a height: 65 kg and 75 kg at 1.8 m
+        response = self.changelist('weightentry', o='4', bmi='normal')
+        self.assertEqual([entry.bmi for entry in response.context['cl'].result_list], [20.06, 23.15])
+        response = self.changelist('weightentry', bmi='unknown')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+        response = self.changelist('userprofile', o='-5')
+        self.assertEqual([profile.age for profile in response.context['cl'].result_list], [24, 23, 22, 21])
+        self.assertEqual(UserProfile.objects.get(user__username='user1').get_age(), 21)
+
+        response = self.changelist('healthgoal', progress_percentage='under_50')
+        self.assertEqual(sorted(goal.current_value for goal in response.context['cl'].result_list), [10, 20, 30, 40])
+
+    def test_large_unfiltered_lists_use_an_estimated_count(self):
+        self.add_users(3)
+        with mock.patch('tracker.pagination.estimated_count', return_value=250000):
+            cl = self.changelist('weightentry').context['cl']
+            self.assertEqual(cl.result_count, 250000)
+            self.assertEqual(self.changelist('weightentry', q='user1').context['cl'].result_count, 1)
+
+
+class AssetBundleTests(TrackerTestCase):
+    def test_pages_only_load_local_assets(self):
+        content = self.client.get(reverse('tracker:home')).content.decode()
+        sources = re.findall(r'(?:href|src)="([^"]+\.(?:css|js))"', content)
+        self.assertEqual(sources, [static(member) for bundle in assets.BUNDLES for member in assets.BUNDLES[bundle]])
+        self.assertNotIn('cdn.jsdelivr.net', content)
+
+    def test_css_urls_are_rebased_onto_the_bundle(self):
+        members = {
+            'vendor/icons/icons.min.css': '@font-face{src:url("fonts/icons.woff2?v=1")}.x{background:url(data:a)}',
+            'css/style.css': '/* theme */\n.y {\n    background: url(../img/bg.png);\n}\n',
+        }
+        with mock.patch.dict(assets.BUNDLES, {'dist/test.css': list(members)}):
+            css = assets.build_bundle('dist/test.css', members.__getitem__)
+        self.assertIn('url("../vendor/icons/fonts/icons.woff2?v=1")', css)
+        self.assertIn('url(data:a)', css)
+        self.assertIn('url(../img/bg.png)', css)
+
+    def test_critical_css_keeps_rules_for_markup_above_the_fold(self):
+        css = (
+            ':root{--x:1}[data-theme=dark]{--x:2}.navbar,.sidebar{color:red}.navbar:hover{color:blue}'
+            '.card .badge{margin:0}.footer{padding:0}@media (min-width:992px){.navbar-nav{display:flex}.x{top:0}}'
+            '@font-face{font-family:i;src:url(i.woff2)}.icon{background:url(i.png)}@keyframes spin{to{opacity:0}}'
+        )
+        markup = critical_css.Markup(
+            '<nav class="navbar {% if x %}sticky{% endif %}"><ul class="navbar-nav"></ul></nav>'
+            '<div class="card icon"><span class="badge bg-{{ color }}">1</span></div>'
+        )
+        self.assertEqual(
+            critical_css.select_rules(critical_css.parse_rules(css), markup),
+            ':root{--x:1}.navbar{color:red}.card .badge{margin:0}@media (min-width:992px){.navbar-nav{display:flex}}',
+        )
+
+    @override_settings(STATICFILES_STORAGE='tracker.assets.BundledStaticFilesStorage',
+                       WHITENOISE_SKIP_COMPRESS_EXTENSIONS=['css', 'js', 'woff', 'woff2', 'svg', ''])
+    def test_collectstatic_builds_fingerprinted_bundles(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            with open(os.path.join(root, 'staticfiles.json')) as handle:
+                manifest = json.load(handle)['paths']
+            self.assertRegex(manifest['dist/app.css'], r'^dist/app\.[0-9a-f]{12}\.css$')
+            self.assertRegex(manifest['dist/app.js'], r'^dist/app\.[0-9a-f]{12}\.js$')
+            with open(os.path.join(root, manifest['dist/app.css'])) as handle:
+                css = handle.read()
+            font = manifest['vendor/bootstrap-icons-1.13.1/fonts/bootstrap-icons.woff2']
+            self.assertIn(f'url("../{font}?', css)
+            self.assertIn('Bootstrap  v5.3.0', css)
+
+            with open(os.path.join(root, 'dist/critical.json')) as handle:
+                critical = json.load(handle)
+            self.assertIn('.navbar-brand{', critical['tracker/home.html'])
+            self.assertNotIn('@font-face', critical['tracker/home.html'])
+
+            # First visit: critical CSS inline, the bundle preloaded without blocking rendering
+            stylesheet = f'<link href="/static/{manifest["dist/app.css"]}" rel="stylesheet">'
+            content = self.client.get(reverse('tracker:home')).content.decode()
+            self.assertIn(f'<style>{critical["tracker/home.html"]}</style>', content)
+            self.assertIn(f'<link href="/static/{manifest["dist/app.css"]}" rel="preload" as="style"', content)
+            self.assertIn(f'<noscript>{stylesheet}</noscript>', content)
+            self.assertIn(f'<script src="/static/{manifest["dist/app.js"]}" defer></script>', content)
+
+            # Once the browser has the bundle, pages just link it
+            self.client.cookies[assets.CSS_COOKIE] = manifest['dist/app.css'].rsplit('/', 1)[-1]
+            content = self.client.get(reverse('tracker:home')).content.decode()
+            self.assertIn(stylesheet, content)
+            self.assertNotIn('rel="preload"', content)
@@ -0,0 +1,125 @@
+"""Rolling statistics for the daily series: moving averages, a smoothed trend and its slope.
+
+Each day a metric was logged gets a ``TrendPoint`` holding the 7- and 30-day moving
+averages, an exponentially weighted trend and the least-squares slope over the last
+30 days. A point depends only on the 30 days up to it plus the trend of the point
+before, so a write on day D recomputes D onwards from DailySummary rows starting at
+D - 29 and the trend stored just before D. Logging today touches one row.
+"""
+from collections import deque
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q, Subquery
+
+from .models import DailySummary, Exercise, Nutrition, TrendPoint, WaterIntake, WeightEntry
+
+# metric -> (DailySummary column, the days that count as logged)
+METRICS = {
+    'weight': ('weight', Q(weight__isnull=False)),
+    'calories_in': ('calories_consumed', Q(meal_count__gt=0)),
+    'calories_out': ('calories_burned', Q(exercise_count__gt=0)),
+    'water': ('water_amount', Q(water_amount__gt=0)),
+}
+
+# Tracker model -> the metric its entries feed.
+TREND_SOURCES = {
+    WeightEntry: 'weight',
+    Nutrition: 'calories_in',
+    Exercise: 'calories_out',
+    WaterIntake: 'water',
+}
+
+SHORT_WINDOW = 7
+WINDOW = 30
+# Share of the gap to each new value the trend closes per day, so a single
+# unusual day moves it by a tenth (about a ten-day memory).
+SMOOTHING = 0.1
+
+
+def _mean(values):
+    return sum(values) / len(values)
+
+
+def _slope(points):
+    """Least-squares change in value per day, or None for fewer than two points"""
+    if len(points) < 2:
+        return None
+    origin = points[0][0]
+    xs = [(day - origin).days for day, _ in points]
+    ys = [value for _, value in points]
+    x_mean, y_mean = _mean(xs), _mean(ys)
+    spread = sum((x - x_mean) ** 2 for x in xs)
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / spread
+
+
+def rolling(points, since=None, previous=None):
+    """Yield ``(date, value, average_7, average_30, trend, slope_30)`` for each point from ``since`` on.
+
+    ``points`` are ``(date, value)`` in date order and must include the 29 days
+    before ``since`` for the windows to be complete. ``previous`` is the
+    ``(date, trend)`` of the last point before ``since``, if any. The trend
+    decays by day rather than by point, so gaps between weigh-ins pull it
+    further towards the next value.
+    """
+    window = deque()
+    for day, value in points:
+        value = float(value)
+        window.append((day, value))
+        while window[0][0] <= day - timedelta(days=WINDOW):
+            window.popleft()
+        if since is not None and day < since:
+            continue
+
+        if previous is None:
+            trend = value
+        else:
+            weight = 1 - (1 - SMOOTHING) ** (day - previous[0]).days
+            trend = previous[1] + weight * (value - previous[1])
+        previous = (day, trend)
+
+        recent = [v for d, v in window if d > day - timedelta(days=SHORT_WINDOW)]
+        yield day, value, _mean(recent), _mean([v for _, v in window]), trend, _slope(window)
+
+
+def refresh_trends(user_id, since=None, metrics=None):
+    """Recompute a user's trend points from ``since`` (default: all history) for ``metrics``.
+
+    Returns the number of points written.
+    """
+    written = 0
+    for metric in metrics or METRICS:
+        column, logged = METRICS[metric]
+        summaries = DailySummary.objects.filter(logged, user_id=user_id)
+        stored = TrendPoint.objects.filter(user_id=user_id, metric=metric)
+        previous = None
+        if since is not None:
+            summaries = summaries.filter(date__gte=since - timedelta(days=WINDOW - 1))
+            previous = stored.filter(date__lt=since).order_by('-date').values_list('date', 'trend').first()
+            stored = stored.filter(date__gte=since)
+
+        points = [
+            TrendPoint(user_id=user_id, metric=metric, date=day, value=value, average_7=average_7,
+                       average_30=average_30, trend=trend, slope_30=slope)
+            for day, value, average_7, average_30, trend, slope in rolling(
+                summaries.order_by('date').values_list('date', column), since, previous,
+            )
+        ]
+        with transaction.atomic():
+            stored.delete()
+            TrendPoint.objects.bulk_create(points, batch_size=500)
+        written += len(points)
+    return written
+
+
+def latest_trends(user_id, day=None, metrics=None):
+    """metric -> the user's most recent TrendPoint (on or before ``day``), in one query"""
+    points = TrendPoint.objects.filter(user_id=user_id)
+    if day is not None:
+        points = points.filter(date__lte=day)
+    # One "latest row" subquery per metric, each a seek to the end of the unique index.
+    # The outer query filters on nothing else so it stays a handful of primary key lookups.
+    latest = Q()
+    for metric in metrics or METRICS:
+        latest |= Q(pk=Subquery(points.filter(metric=metric).order_by('-date').values('pk')[:1]))
+    return {point.metric: point for point in TrendPoint.objects.filter(latest).order_by()}
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'tracker'
 
@@ -16,7 +16,10 @@ urlpatterns = [
     path('mood/', views.mood_tracker, name='mood_tracker'),
     path('profile/', views.profile, name='profile'),
     path('analytics/', views.analytics, name='analytics'),
+    path('analytics/correlations/', views.correlations, name='correlations'),
     path('quick-add/', views.quick_add, name='quick_add'),
+    path('import/', views.import_data, name='import_data'),
+    path('export/', views.export_data, name='export_data'),
     
     # CRUD operations
     path('edit/<str:model_name>/<int:entry_id>/', views.edit_entry, name='edit_entry'),
@@ -24,4 +27,11 @@ urlpatterns = [
     
     # API endpoints
     path('api/chart-data/', views.get_chart_data, name='chart_data'),
+    path('api/quick-add/', views.quick_add_batch, name='quick_add_batch'),
+    path('api/profiling/', views.profiling_report, name='profiling_report'),
+    
+    # Async variants for ASGI deployments (see tracker/async_views.py)
+    path('async/dashboard/', async_views.dashboard, name='dashboard_async'),
+    path('async/analytics/', async_views.analytics, name='analytics_async'),
+    path('async/api/chart-data/', async_views.get_chart_data, name='chart_data_async'),
 ]
@@ -1,17 +1,42 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, authenticate
-from django.db.models import Sum, Avg, Count, Q
+from django.contrib.admin.views.decorators import staff_member_required
 from django.utils import timezone
-from datetime import datetime, timedelta
-from django.http import JsonResponse
-from django.core.paginator import Paginator
+from datetime import datetime
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_POST
 from .models import *
 from .forms import *
+from . import charts, correlations as correlation_report, profiling, stats as tracker_stats
+from .analytics import build_summary
+from .batch import MAX_BATCH_SIZE, BatchConflict, log_entries
+from .caching import cached, get_version
+from .exporters import EXPORT_FORMATS, content_type, iter_export
+from .goal_progress import with_progress
+from .importers import IMPORT_FORMS, Importer, iter_records
+from .pagination import KeysetPaginator
+from .trends import latest_trends
+import csv
+import io
 import json
 
 
+def paginate(request, queryset, count=None):
+    # Total comes from the page's cached stats query; keyset pages never run COUNT(*)
+    return KeysetPaginator(queryset, count=count).get_page(request.GET.get('cursor'))
+
+
+def recent_entries_chart(page_obj, field, element_id, points=10):
+    """Data island with the page's ``points`` latest entries, oldest first, as ``{'date': [...], field: [...]}``"""
+    entries = reversed(page_obj[:points])
+    return charts.json_script(charts.columns(((entry.date, getattr(entry, field)) for entry in entries), 'date', field),
+                              element_id)
+
+
 def home(request):
     if request.user.is_authenticated:
         return redirect('tracker:dashboard')
@@ -31,47 +56,28 @@ def register(request):
     return render(request, 'tracker/register.html', {'form': form})
 
 
+def dashboard_queries(user, today):
+    """One independent query per dashboard context entry"""
+    return {
+        # Today's totals come from the rollup row kept current by tracker.signals
+        'summary': lambda: DailySummary.objects.filter(user=user, date=today).first(),
+        'recent_weight': lambda: list(WeightEntry.objects.filter(user=user).order_by('-date')[:7]),
+        'recent_exercise': lambda: list(Exercise.objects.filter(user=user).order_by('-date')[:5]),
+        'active_goals': lambda: list(
+            with_progress(HealthGoal.objects.filter(user=user, status='active'), today).order_by('target_date')[:5]
+        ),
+    }
+
+
 @login_required
 def dashboard(request):
     today = timezone.now().date()
     user = request.user
     
-    # Get today's data
-    try:
-        today_weight = WeightEntry.objects.filter(user=user, date=today).latest('created_at')
-    except WeightEntry.DoesNotExist:
-        today_weight = None
-    
-    try:
-        today_mood = Mood.objects.get(user=user, date=today)
-    except Mood.DoesNotExist:
-        today_mood = None
-    
-    # Get recent data
-    recent_weight = WeightEntry.objects.filter(user=user).order_by('-date')[:7]
-    recent_exercise = Exercise.objects.filter(user=user).order_by('-date')[:5]
-    recent_nutrition = Nutrition.objects.filter(user=user).order_by('-date')[:5]
-    
-    # Calculate today's totals
-    today_exercise_calories = Exercise.objects.filter(user=user, date=today).aggregate(Sum('calories_burned'))['calories_burned__sum'] or 0
-    today_nutrition_calories = Nutrition.objects.filter(user=user, date=today).aggregate(Sum('calories'))['calories__sum'] or 0
-    today_water = WaterIntake.objects.filter(user=user, date=today).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Get active goals
-    active_goals = HealthGoal.objects.filter(user=user, status='active').order_by('target_date')[:5]
-    
-    context = {
-        'today_weight': today_weight,
-        'today_mood': today_mood,
-        'recent_weight': recent_weight,
-        'recent_exercise': recent_exercise,
-        'recent_nutrition': recent_nutrition,
-        'today_exercise_calories': today_exercise_calories,
-        'today_nutrition_calories': today_nutrition_calories,
-        'today_water': today_water,
-        'active_goals': active_goals,
-    }
+    def build_context():
+        return {name: query() for name, query in dashboard_queries(user, today).items()}
     
+    context = cached(user.pk, 'dashboard', build_context, today)
     return render(request, 'tracker/dashboard.html', context)
 
 
@@ -88,27 +94,22 @@ def weight_tracker(request):
     else:
         form = WeightEntryForm()
     
-    weight_entries = WeightEntry.objects.filter(user=request.user).order_by('-date')
-    paginator = Paginator(weight_entries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Calculate statistics
-    if weight_entries.exists():
-        latest_weight = weight_entries.first().weight
-        first_weight = weight_entries.last().weight
-        weight_change = latest_weight - first_weight
-        avg_weight = weight_entries.aggregate(Avg('weight'))['weight__avg']
-    else:
-        latest_weight = first_weight = weight_change = avg_weight = None
+    weight_entries = WeightEntry.objects.filter(user=request.user).order_by('-date', '-id')
+    stats = cached(request.user.pk, 'weight_stats', lambda: {
+        **tracker_stats.weight_stats(request.user),
+        'trend': latest_trends(request.user.pk, metrics=['weight']).get('weight'),
+    })
+    page_obj = paginate(request, weight_entries, stats['count'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'latest_weight': latest_weight,
-        'first_weight': first_weight,
-        'weight_change': weight_change,
-        'avg_weight': avg_weight,
+        'latest_weight': stats['latest_weight'],
+        'first_weight': stats['first_weight'],
+        'weight_change': stats['weight_change'],
+        'avg_weight': stats['avg_weight'],
+        'trend': stats['trend'],
+        'chart_data': recent_entries_chart(page_obj, 'weight', 'weight-chart-data'),
     }
     
     return render(request, 'tracker/weight_tracker.html', context)
@@ -127,22 +128,17 @@ def exercise_tracker(request):
     else:
         form = ExerciseForm()
     
-    exercises = Exercise.objects.filter(user=request.user).order_by('-date')
-    paginator = Paginator(exercises, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Calculate statistics
-    total_exercises = exercises.count()
-    total_calories = exercises.aggregate(Sum('calories_burned'))['calories_burned__sum'] or 0
-    total_duration = exercises.aggregate(Sum('duration'))['duration__sum'] or 0
+    exercises = Exercise.objects.filter(user=request.user).order_by('-date', '-id')
+    stats = cached(request.user.pk, 'exercise_stats', lambda: tracker_stats.exercise_stats(request.user))
+    page_obj = paginate(request, exercises, stats['count'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'total_exercises': total_exercises,
-        'total_calories': total_calories,
-        'total_duration': total_duration,
+        'total_exercises': stats['count'],
+        'total_calories': stats['total_calories'],
+        'total_duration': stats['total_duration'],
+        'chart_data': recent_entries_chart(page_obj, 'calories_burned', 'exercise-chart-data'),
     }
     
     return render(request, 'tracker/exercise_tracker.html', context)
@@ -161,26 +157,18 @@ def nutrition_tracker(request):
     else:
         form = NutritionForm()
     
-    nutrition_entries = Nutrition.objects.filter(user=request.user).order_by('-date')
-    paginator = Paginator(nutrition_entries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Calculate today's totals
+    nutrition_entries = Nutrition.objects.filter(user=request.user).order_by('-date', '-id')
     today = timezone.now().date()
-    today_nutrition = nutrition_entries.filter(date=today)
-    today_calories = today_nutrition.aggregate(Sum('calories'))['calories__sum'] or 0
-    today_protein = today_nutrition.aggregate(Sum('protein'))['protein__sum'] or 0
-    today_carbs = today_nutrition.aggregate(Sum('carbs'))['carbs__sum'] or 0
-    today_fat = today_nutrition.aggregate(Sum('fat'))['fat__sum'] or 0
+    stats = cached(request.user.pk, 'nutrition_stats', lambda: tracker_stats.nutrition_stats(request.user, today), today)
+    page_obj = paginate(request, nutrition_entries, stats['count'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'today_calories': today_calories,
-        'today_protein': today_protein,
-        'today_carbs': today_carbs,
-        'today_fat': today_fat,
+        'today_calories': stats['today_calories'],
+        'today_protein': stats['today_protein'],
+        'today_carbs': stats['today_carbs'],
+        'today_fat': stats['today_fat'],
     }
     
     return render(request, 'tracker/nutrition_tracker.html', context)
@@ -199,31 +187,20 @@ def sleep_tracker(request):
     else:
         form = SleepForm()
     
-    sleep_entries = Sleep.objects.filter(user=request.user).order_by('-sleep_time')
-    paginator = Paginator(sleep_entries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Calculate statistics
-    total_sleep_entries = sleep_entries.count()
-    avg_sleep_quality = sleep_entries.aggregate(Avg('quality'))['quality__avg'] or 0
-    
-    # Calculate average sleep duration manually since it's a property
-    total_duration = 0
-    valid_entries = 0
-    for entry in sleep_entries:
-        if entry.sleep_time and entry.wake_time:
-            total_duration += entry.duration_hours
-            valid_entries += 1
-    
-    avg_sleep_duration = round(total_duration / valid_entries, 1) if valid_entries > 0 else 0
+    sleep_entries = Sleep.objects.filter(user=request.user).order_by('-sleep_time', '-id')
+    stats = cached(request.user.pk, 'sleep_stats', lambda: tracker_stats.sleep_stats(request.user))
+    page_obj = paginate(request, sleep_entries, stats['count'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'total_sleep_entries': total_sleep_entries,
-        'avg_sleep_quality': avg_sleep_quality,
-        'avg_sleep_duration': avg_sleep_duration,
+        'total_sleep_entries': stats['count'],
+        'avg_sleep_quality': stats['avg_sleep_quality'],
+        'avg_sleep_duration': stats['avg_sleep_duration'],
+        'total_sleep_hours': stats['total_sleep_hours'],
+        'short_nights': stats['short_nights'],
+        'recommended_nights': stats['recommended_nights'],
+        'long_nights': stats['long_nights'],
     }
     
     return render(request, 'tracker/sleep_tracker.html', context)
@@ -242,19 +219,15 @@ def water_tracker(request):
     else:
         form = WaterIntakeForm()
     
-    water_entries = WaterIntake.objects.filter(user=request.user).order_by('-date', '-time')
-    paginator = Paginator(water_entries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Calculate today's total
+    water_entries = WaterIntake.objects.filter(user=request.user).order_by('-date', '-time', '-id')
     today = timezone.now().date()
-    today_water = water_entries.filter(date=today).aggregate(Sum('amount'))['amount__sum'] or 0
+    stats = cached(request.user.pk, 'water_stats', lambda: tracker_stats.water_stats(request.user, today), today)
+    page_obj = paginate(request, water_entries, stats['count'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'today_water': today_water,
+        'today_water': stats['today_water'],
         'today': today,
         'now': timezone.now(),
     }
@@ -275,15 +248,21 @@ def goals(request):
     else:
         form = HealthGoalForm()
     
-    active_goals = HealthGoal.objects.filter(user=request.user, status='active').order_by('target_date')
-    completed_goals = HealthGoal.objects.filter(user=request.user, status='completed').order_by('-updated_at')
-    paused_goals = HealthGoal.objects.filter(user=request.user, status='paused').order_by('-updated_at')
+    # One query for every status, read in (user, status, updated_at) index order; only the
+    # active goals need re-sorting, by deadline, in memory.
+    goals_by_status = {status: [] for status, _ in HealthGoal.STATUS_CHOICES}
+    user_goals = with_progress(HealthGoal.objects.filter(user=request.user), timezone.now().date())
+    for goal in user_goals.order_by('-status', '-updated_at'):
+        goals_by_status[goal.status].append(goal)
+    active_goals = sorted(goals_by_status['active'], key=lambda goal: goal.target_date)
     
     context = {
         'form': form,
         'active_goals': active_goals,
-        'completed_goals': completed_goals,
-        'paused_goals': paused_goals,
+        'completed_goals': goals_by_status['completed'],
+        'paused_goals': goals_by_status['paused'],
+        'total_goals': sum(map(len, goals_by_status.values())),
+        'overdue_goals': sum(goal.is_overdue for goal in active_goals),
     }
     
     return render(request, 'tracker/goals.html', context)
@@ -302,20 +281,15 @@ def mood_tracker(request):
     else:
         form = MoodForm()
     
-    mood_entries = Mood.objects.filter(user=request.user).order_by('-date')
-    paginator = Paginator(mood_entries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Calculate statistics
-    total_mood_entries = mood_entries.count()
-    avg_mood = mood_entries.aggregate(Avg('mood'))['mood__avg'] or 0
+    mood_entries = Mood.objects.filter(user=request.user).order_by('-date', '-id')
+    stats = cached(request.user.pk, 'mood_stats', lambda: tracker_stats.mood_stats(request.user))
+    page_obj = paginate(request, mood_entries, stats['count'])
     
     context = {
         'form': form,
         'page_obj': page_obj,
-        'total_mood_entries': total_mood_entries,
-        'avg_mood': avg_mood,
+        'total_mood_entries': stats['count'],
+        'avg_mood': stats['avg_mood'],
         'today': timezone.now().date(),
     }
     
@@ -371,54 +345,28 @@ def profile(request):
 
 @login_required
 def analytics(request):
-    user = request.user
+    days = charts.parse_days(request.GET.get('days', 30))
     today = timezone.now().date()
-    
-    # Date range for analytics
-    days = request.GET.get('days', 30)
-    try:
-        days = int(days)
-    except ValueError:
-        days = 30
-    
-    start_date = today - timedelta(days=days)
-    
-    # Weight analytics
-    weight_data = WeightEntry.objects.filter(
-        user=user, 
-        date__range=[start_date, today]
-    ).order_by('date')
-    
-    # Exercise analytics
-    exercise_data = Exercise.objects.filter(
-        user=user, 
-        date__range=[start_date, today]
-    ).order_by('date')
-    
-    # Nutrition analytics
-    nutrition_data = Nutrition.objects.filter(
-        user=user, 
-        date__range=[start_date, today]
-    ).order_by('date')
-    
-    # Calculate weight change
-    weight_change = None
-    if weight_data.exists():
-        first_weight = weight_data.first().weight
-        last_weight = weight_data.last().weight
-        weight_change = last_weight - first_weight
-    
-    context = {
+    summary = cached(request.user.pk, 'analytics', lambda: build_summary(request.user, days, today), days, today)
+    return render(request, 'tracker/analytics.html', {
+        'summary': summary,
+        'chart_data': charts.json_script(summary.chart_data(), 'analytics-chart-data'),
+    })
+
+
+@login_required
+def correlations(request):
+    days = charts.parse_days(request.GET.get('days', 365))
+    today = timezone.now().date()
+    report = None
+    if correlation_report.AVAILABLE:
+        report = cached(request.user.pk, 'correlations',
+                        lambda: correlation_report.build_report(request.user, days, today), days, today)
+    return render(request, 'tracker/correlations.html', {
+        'report': report,
         'days': days,
-        'weight_data': weight_data,
-        'exercise_data': exercise_data,
-        'nutrition_data': nutrition_data,
-        'start_date': start_date,
-        'today': today,
-        'weight_change': weight_change,
-    }
-    
-    return render(request, 'tracker/analytics.html', context)
+        'min_pairs': correlation_report.MIN_PAIRS,
+    })
 
 
 @login_required
@@ -493,6 +441,31 @@ def quick_add(request):
     return render(request, 'tracker/quick_add.html', context)
 
 
+@login_required
+@require_POST
+def quick_add_batch(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    items = payload.get('entries') if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'error': 'Expected a non-empty list of entries.'}, status=400)
+    if len(items) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'At most {MAX_BATCH_SIZE} entries per request.'}, status=400)
+    
+    atomic = isinstance(payload, dict) and bool(payload.get('atomic'))
+    try:
+        results = log_entries(request.user, items, atomic=atomic)
+    except BatchConflict:
+        return JsonResponse({'error': 'Some entries were logged concurrently; retry the batch.'}, status=409)
+    
+    created = sum(result['status'] == 'created' for result in results)
+    # 207 Multi-Status: some items were written, the per-item results say which
+    status = 201 if created == len(results) else 207 if created else 400
+    return JsonResponse({'created': created, 'failed': len(results) - created, 'results': results}, status=status)
+
+
 @login_required
 def edit_entry(request, model_name, entry_id):
     model_map = {
@@ -575,34 +548,69 @@ def delete_entry(request, model_name, entry_id):
 
 
 @login_required
+def import_data(request):
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                records = iter_records(stream, form.cleaned_data['file_format'])
+                result = Importer(request.user, form.cleaned_data['model_name']).run(records)
+            except (ValueError, csv.Error) as e:
+                messages.error(request, f'Could not read the file: {e}')
+                return redirect('tracker:import_data')
+            if result.imported:
+                messages.success(request, f'{result.imported} entries imported successfully!')
+            if result.error_count:
+                messages.warning(request, f'{result.error_count} rows were skipped because they were invalid.')
+            return render(request, 'tracker/import_data.html', {'form': ImportForm(), 'result': result})
+    else:
+        form = ImportForm()
+    
+    return render(request, 'tracker/import_data.html', {'form': form})
+
+
+@login_required
+def export_data(request):
+    fmt = request.GET.get('format', 'zip')
+    model_name = request.GET.get('model')
+    if fmt not in EXPORT_FORMATS or (model_name and model_name not in IMPORT_FORMS):
+        return HttpResponseBadRequest('Unknown export format or model')
+    if fmt == 'csv' and not model_name:
+        return HttpResponseBadRequest('CSV exports need a model; use format=zip for everything')
+    
+    model_names = [model_name] if model_name else list(IMPORT_FORMS)
+    response = StreamingHttpResponse(iter_export(request.user, fmt, model_names), content_type=content_type(fmt))
+    filename = f'health-tracker-{model_name or "all"}-{timezone.now().date()}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def chart_data_etag(request):
+    # The user's data version changes on every write, so polling clients get a 304
+    # without the aggregation queries running while nothing has changed.
+    days = charts.parse_days(request.GET.get('days', 30))
+    bucket = charts.choose_bucket(days, request.GET.get('bucket', 'auto'))
+    return f'{get_version(request.user.pk)}-{days}-{bucket}-{timezone.now().date()}'
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@etag(chart_data_etag)
 def get_chart_data(request):
-    days = int(request.GET.get('days', 30))
+    days = charts.parse_days(request.GET.get('days', 30))
+    # Normalised like the ETag, so bucket=auto, bucket= and bucket=foo share one cache entry
+    bucket = charts.choose_bucket(days, request.GET.get('bucket', 'auto'))
     today = timezone.now().date()
-    start_date = today - timedelta(days=days)
-    
-    # Weight data
-    weight_data = WeightEntry.objects.filter(
-        user=request.user,
-        date__range=[start_date, today]
-    ).order_by('date').values('date', 'weight')
-    
-    # Exercise data
-    exercise_data = Exercise.objects.filter(
-        user=request.user,
-        date__range=[start_date, today]
-    ).order_by('date').values('date').annotate(
-        total_duration=Sum('duration'),
-        total_calories=Sum('calories_burned')
-    )
-    
-    # Water data
-    water_data = WaterIntake.objects.filter(
-        user=request.user,
-        date__range=[start_date, today]
-    ).order_by('date').values('date').annotate(total_amount=Sum('amount'))
-    
-    return JsonResponse({
-        'weight_data': list(weight_data),
-        'exercise_data': list(exercise_data),
-        'water_data': list(water_data),
-    })
+    data = cached(request.user.pk, 'chart_data', lambda: charts.chart_data(request.user, days, bucket, today),
+                  days, bucket, today)
+    return HttpResponse(charts.dumps(data), content_type='application/json')
+
+
+@staff_member_required
+def profiling_report(request):
+    sort = request.GET.get('sort', 'wall_ms')
+    if sort not in profiling.SORT_KEYS:
+        return HttpResponseBadRequest(f'sort must be one of {", ".join(profiling.SORT_KEYS)}')
+    return JsonResponse({'enabled': getattr(settings, 'PROFILING', False), 'views': profiling.report(sort)})